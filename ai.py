@@ -1,102 +1,8 @@
+import threading
 import time
-import numpy as np
-import random
+import traceback
 
-from fianco import ZOBRIST, owner_to_id, get_board_hash, initialize_zobrist
-from board import BOARD_SIZE
-
-def get_all_possible_capture_moves(game, player):
-    capture_moves = []
-
-    if player == 'Player1':
-        directions = np.array([[2, 2], [2, -2]], dtype=np.int8)
-    else:
-        directions = np.array([[-2, 2], [-2, -2]], dtype=np.int8)
-
-    for piece in game.pieces:
-        if piece.owner == player:
-            if piece.row < 0 or piece.col < 0:
-                continue
-
-            candidates = piece.position + directions
-            valid_mask = (
-                (candidates[:,0] >= 0) & (candidates[:,0] < BOARD_SIZE) &
-                (candidates[:,1] >= 0) & (candidates[:,1] < BOARD_SIZE)
-            )
-            candidates = candidates[valid_mask]
-
-            for cand in candidates:
-                r, c = cand
-                is_ok, _, cap = game.is_valid_move(piece, r, c)
-                if is_ok and cap is not None:
-                    capture_moves.append((piece, r, c, cap))
-
-    return capture_moves
-
-def get_all_possible_moves(game, player):
-    all_moves = []
-    capture_moves = []
-
-    if player == 'Player1':
-        directions = np.array([
-            [1, 0],
-            [0, 1],
-            [0, -1],
-            [2, 2],
-            [2, -2],
-        ], dtype=np.int8)
-    else:
-        directions = np.array([
-            [-1, 0],
-            [0, 1],
-            [0, -1],
-            [-2, 2],
-            [-2, -2],
-        ], dtype=np.int8)
-
-    for piece in game.pieces:
-        if piece.owner == player:
-            if piece.row < 0 or piece.col < 0:
-                continue
-
-            candidates = piece.position + directions
-            valid_mask = (
-                (candidates[:,0] >= 0) & (candidates[:,0] < BOARD_SIZE) &
-                (candidates[:,1] >= 0) & (candidates[:,1] < BOARD_SIZE)
-            )
-            candidates = candidates[valid_mask]
-
-            for cand in candidates:
-                r, c = cand
-                is_ok, _, cap = game.is_valid_move(piece, r, c)
-                if is_ok:
-                    if cap is not None:
-                        capture_moves.append((piece, r, c, cap))
-                    else:
-                        all_moves.append((piece, r, c, None))
-
-    # mandatory capture
-    if capture_moves:
-        return capture_moves
-    else:
-        return all_moves
-
-def evaluate_position(game):
-    owners = [p.owner for p in game.pieces if p.row >= 0 and p.col >= 0]
-    arr = np.array([1 if o == 'Player1' else -1 for o in owners], dtype=np.int8)
-    val = arr.sum()
-    return val
-
-def order_moves(game, moves, depth):
-    captures = []
-    normal = []
-    for m in moves:
-        piece, r, c, captured = m
-        if captured is not None:
-            captures.append(m)
-        else:
-            normal.append(m)
-    return captures + normal
+from engine import GameState, Position, iter_moves, iterative_deepening, parallel_search, search_position
 
 def update_ai_time_limit(game):
     remaining_time = game.player_times[game.ai_player]
@@ -105,93 +11,173 @@ def update_ai_time_limit(game):
     else:
         game.iterative_time_limit = 5000
 
+# ------------------ Pondering --------------------
+def ponder_search(game, pos):
+    try:
+        game.ponder_result = search_position(game, pos, game.max_depth)
+    except Exception:
+        # ponder_result stays None; a ponder hit then searches again
+        traceback.print_exc()
+
+def start_pondering(game, expected_reply=None):
+    # Searches on the opponent's time: the position after the expected reply,
+    # or without one the opponent's own position, which still fills the TT
+    pos = Position.from_game(game)
+    if expected_reply is not None and pos.is_legal(expected_reply):
+        pos.make_move(expected_reply)
+        pos = pos.copy()
+    game.ponder_hash = pos.hash
+    game.ponder_result = None
+    game.ponder_start = time.time() * 1000
+    game.stop_event = threading.Event()
+    game.ponder_thread = threading.Thread(target=ponder_search, args=(game, pos), daemon=True)
+    game.ponder_thread.start()
+
+def stop_pondering(game):
+    # The TT entries of a cancelled ponder search are kept
+    if game.ponder_thread is not None:
+        game.stop_event.set()
+        game.ponder_thread.join()
+        game.ponder_thread = None
+        game.stop_event = None
+
 # ------------------ AI Search (Negamax) --------------------
-def make_ai_move(game):
+def search_ai_move(game):
+    # Searches the AI's move without touching the board, so it can run in a
+    # thread. -> (steps, depth, score, expected reply)
     start_ms = time.time() * 1000
-    best_move = None
-    depth = 5  # sabit derinlik
-
-    update_ai_time_limit(game)
-    best_move = negamax_root(game, depth, -999999, 999999)
-
-    if best_move:
-        game.make_move(best_move)
-        elapsed_time = time.time() * 1000 - start_ms
-        game.player_times[game.ai_player] -= elapsed_time
-        print(f"[AI] depth={depth}, prune_count={game.prune_count}, nodes={game.nodes_searched}")
-        game.total_prunes += game.prune_count
-        if game.prune_count > game.max_prune_per_move:
-            game.max_prune_per_move = game.prune_count
+    pos = Position.from_game(game)
+
+    # Opening book: one binary search in the memory-mapped file, no search
+    entry = game.book.probe(pos.hash) if game.book is not None else None
+    if entry is not None and pos.is_legal(entry[0]):
+        stop_pondering(game)
+        game.pv = ()
+        game.prune_count = game.nodes_searched = game.qnodes_searched = 0
+        print("[AI] book move")
+        move, score, depth = entry
+        return pos.to_game_moves(game, move), depth, score, None
+
+    ponder_result = None
+    if game.ponder_thread is not None and game.ponder_hash == pos.hash:
+        # Ponder hit: the search of this position is already running. The time
+        # it had while the opponent was thinking counts towards the budget, so
+        # after a long think the move comes at once.
+        remaining = game.iterative_time_limit - (start_ms - game.ponder_start)
+        game.ponder_thread.join(max(remaining, 0) / 1000)
+        stop_pondering(game)
+        ponder_result = game.ponder_result
+        if ponder_result is None:
+            print("[AI] ponder search failed, searching again")
+
+    if ponder_result is not None:
+        move, depth, score = ponder_result
+        steps = pos.to_game_moves(game, move) if move is not None else None
+        print("[AI] ponder hit")
     else:
+        stop_pondering(game)
+        search = parallel_search if game.workers > 1 else iterative_deepening
+        game.stop_event = game.ai_cancel
+        try:
+            steps, depth, score = search(
+                game,
+                max_depth=game.max_depth,
+                max_nodes=game.max_nodes,
+                movetime=game.iterative_time_limit
+            )
+        finally:
+            game.stop_event = None
+
+    # The reply the search expects, if its PV starts with the move played
+    expected_reply = None
+    if steps and len(game.pv) > 1 and pos.to_game_moves(game, game.pv[0]) == steps:
+        expected_reply = game.pv[1]
+    return steps, depth, score, expected_reply
+
+def play_ai_move(game, result, elapsed_time, charge_time=True):
+    steps, depth, score, expected_reply = result
+    if not steps:
         print("[AI] No valid move found. pass")
+        return
 
-def negamax_root(game, depth, alpha, beta):
-    moves = get_all_possible_moves(game, game.current_player)
-    moves = order_moves(game, moves, depth)
-
-    best_score = -999999
-    best_move = None
-
-    for move in moves:
-        prev = game.make_move(move, store_previous_state=True)
-        game.current_player = 'Player2' if game.current_player == 'Player1' else 'Player1'
-
-        score = -negamax(game, depth - 1, -beta, -alpha, 1)
-        game.unmake_move(prev)
-
-        if score > best_score:
-            best_score = score
-            best_move = move
-        if best_score > alpha:
-            alpha = best_score
-        if alpha >= beta:
-            game.prune_count += 1
-            break
-
-    return best_move
-
-def negamax(game, depth, alpha, beta, color):
-    # TT Access
-    board_hash = get_board_hash(game)
-    game.tt_accesses += 1
-
-    if board_hash in game.ttable:
-        stored_score, stored_depth = game.ttable[board_hash]
-        if stored_depth >= depth:
-            return stored_score * color
-
-    if depth == 0 or game.game_over:
-        game.nodes_searched += 1
-        eval_score = evaluate_position(game)
-        # Save to TT
-        game.ttable[board_hash] = (eval_score, depth)
-        return eval_score * color
-
-    moves = get_all_possible_moves(game, game.current_player)
-    if not moves:
-        game.nodes_searched += 1
-        eval_score = evaluate_position(game)
-        game.ttable[board_hash] = (eval_score, depth)
-        return eval_score * color
-
-    moves = order_moves(game, moves, depth)
-    best_score = -999999
-
-    for move in moves:
-        prev = game.make_move(move, store_previous_state=True)
-        game.current_player = 'Player2' if game.current_player == 'Player1' else 'Player1'
-
-        score = -negamax(game, depth - 1, -beta, -alpha, -color)
-        game.unmake_move(prev)
-
-        if score > best_score:
-            best_score = score
-        if best_score > alpha:
-            alpha = best_score
-        if alpha >= beta:
-            game.prune_count += 1
-            break
-
-    raw_score = best_score if color == 1 else -best_score
-    game.ttable[board_hash] = (raw_score, depth)
-    return best_score
+    if charge_time:
+        game.player_times[game.ai_player] -= elapsed_time
+    print(f"[AI] depth={depth}, score={score}, prune_count={game.prune_count}, "
+          f"nodes={game.nodes_searched}, qnodes={game.qnodes_searched}, time={elapsed_time:.0f}ms")
+    if game.tablebase is not None and game.tb_hits:
+        print(f"[AI] tablebase hits={game.tb_hits}")
+    if game.cache is not None and game.cache_hits:
+        print(f"[AI] cache hits={game.cache_hits}")
+    if game.workers > 1:
+        print(f"[AI] workers={game.workers}, total nodes={game.parallel_nodes}, "
+              f"nps={game.parallel_nodes * 1000 / max(elapsed_time, 1):.0f}")
+    game.total_prunes += game.prune_count
+    if game.prune_count > game.max_prune_per_move:
+        game.max_prune_per_move = game.prune_count
+
+    # The jumps of a chain before the last one go through GameState.make_move,
+    # so a front-end does not start a new AI search in the middle of the chain
+    for step in steps[:-1]:
+        GameState.make_move(game, step)
+    game.make_move(steps[-1])
+
+    if game.use_ponder and not game.game_over:
+        start_pondering(game, expected_reply)
+
+def make_ai_move(game):
+    # Blocking: searches and plays the move
+    start_ms = time.time() * 1000
+    update_ai_time_limit(game)
+    result = search_ai_move(game)
+    play_ai_move(game, result, time.time() * 1000 - start_ms)
+
+# ------------------ Non-blocking AI --------------------
+# The front-end starts the search in a thread and polls it every frame; the
+# move itself is played on the caller's thread.
+def ai_search_thread(game):
+    try:
+        game.ai_result = search_ai_move(game)
+    except Exception as error:
+        # Handed to poll_ai_move on the front-end's thread
+        game.ai_error = error
+
+def start_ai_move(game):
+    update_ai_time_limit(game)
+    game.ai_result = None
+    game.ai_error = None
+    game.ai_cancel = threading.Event()
+    game.ai_start = time.time() * 1000
+    game.ai_thread = threading.Thread(target=ai_search_thread, args=(game,), daemon=True)
+    game.ai_thread.start()
+
+def poll_ai_move(game):
+    # Plays the move once the search is done; True when it did
+    if game.ai_thread is None or game.ai_thread.is_alive():
+        return False
+    game.ai_thread.join()
+    game.ai_thread = None
+    game.ai_cancel = None
+    result = game.ai_result
+    error, game.ai_error = game.ai_error, None
+    if error is not None:
+        # The failed search is reported and the first legal move played, so
+        # the game goes on
+        print("[AI] search failed:")
+        traceback.print_exception(type(error), error, error.__traceback__)
+        move = next(iter_moves(game, game.current_player), None)
+        result = ([move] if move is not None else None, 0, None, None)
+    # The front-end's clock was running for the AI during the search
+    play_ai_move(game, result, time.time() * 1000 - game.ai_start, charge_time=False)
+    return True
+
+def cancel_ai_move(game):
+    # Stops a running search and drops its move (new game, timeout, quit)
+    if game.ai_thread is not None:
+        game.ai_cancel.set()
+        # Read once: the search thread sets it to None when it finishes
+        event = game.stop_event
+        if event is not None:
+            event.set()
+        game.ai_thread.join()
+        game.ai_thread = None
+        game.ai_cancel = None
@@ -0,0 +1,104 @@
+import argparse
+import random
+import time
+
+from engine import GameState, iter_moves, iterative_deepening, parallel_search, close_search_pool
+
+# Fixed benchmark positions: the start position and the positions reached
+# after a seeded random sequence of moves of each length
+BENCH_PLIES = (0, 6, 12, 18, 24, 30)
+BENCH_SEED = 2024
+
+# name -> search options set on the game before each run
+CONFIGS = {
+    'plain': {'use_pvs': False, 'aspiration_window': 0},
+    'pvs': {'use_pvs': True, 'aspiration_window': 0},
+    'aspiration': {'use_pvs': False, 'aspiration_window': 50},
+    'pvs+aspiration': {'use_pvs': True, 'aspiration_window': 50},
+    'no-quiescence': {'use_pvs': True, 'aspiration_window': 50, 'use_quiescence': False},
+    'no-lmr': {'use_pvs': True, 'aspiration_window': 50, 'use_lmr': False},
+    'no-null-move': {'use_pvs': True, 'aspiration_window': 50, 'use_null_move': False},
+    'no-selective': {'use_pvs': True, 'aspiration_window': 50, 'use_lmr': False, 'use_null_move': False},
+    'no-repetition': {'use_pvs': True, 'aspiration_window': 50, 'repetition_limit': 0},
+}
+
+def bench_position(plies):
+    game = GameState()
+    game.reset_game()
+    rng = random.Random(BENCH_SEED + plies)
+    for _ in range(plies):
+        moves = list(iter_moves(game, game.current_player))
+        if not moves or game.game_over:
+            break
+        game.make_move(rng.choice(moves))
+    return game
+
+def run(depth, configs):
+    results = {}
+    for name in configs:
+        # fresh games, so no TT or history carries over between configs
+        positions = [bench_position(plies) for plies in BENCH_PLIES]
+        total_nodes = 0
+        total_qnodes = 0
+        start = time.time()
+        for game in positions:
+            for key, value in CONFIGS[name].items():
+                setattr(game, key, value)
+            iterative_deepening(game, max_depth=depth)
+            total_nodes += game.nodes_searched
+            total_qnodes += game.qnodes_searched
+        results[name] = (total_nodes, total_qnodes, time.time() - start)
+
+    base_nodes = results[configs[0]][0]
+    print(f"depth {depth}, {len(BENCH_PLIES)} positions")
+    for name in configs:
+        nodes, qnodes, elapsed = results[name]
+        print(f"{name:>16}: nodes={nodes:>9}  ({100.0 * nodes / base_nodes:5.1f}%)  "
+              f"qnodes={qnodes:>8}  time={elapsed:6.2f}s  nps={nodes / max(elapsed, 1e-9):8.0f}")
+
+def scaling(workers_list, movetime):
+    # Nodes per second of the Lazy SMP search for each worker count
+    print(f"movetime {movetime}ms, {len(BENCH_PLIES)} positions")
+    base_nps = None
+    for workers in workers_list:
+        total_nodes = 0
+        total_depth = 0
+        elapsed = 0.0
+        for plies in BENCH_PLIES:
+            game = bench_position(plies)
+            game.workers = workers
+            if workers > 1:
+                # worker start-up is not part of the measured time
+                parallel_search(game, max_depth=1)
+                start = time.time()
+                _, depth, _ = parallel_search(game, movetime=movetime)
+                total_nodes += game.parallel_nodes
+            else:
+                start = time.time()
+                _, depth, _ = iterative_deepening(game, movetime=movetime)
+                total_nodes += game.nodes_searched
+            elapsed += time.time() - start
+            close_search_pool(game)
+            total_depth += depth
+        nps = total_nodes / max(elapsed, 1e-9)
+        if base_nps is None:
+            base_nps = nps
+        print(f"{workers:>3} workers: nodes={total_nodes:>9}  nps={nps:8.0f}  ({nps / base_nps:4.2f}x)  "
+              f"avg depth={total_depth / len(BENCH_PLIES):4.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Node counts of search options on fixed positions')
+    parser.add_argument('--depth', type=int, default=5)
+    parser.add_argument('--configs', nargs='+', choices=list(CONFIGS), default=list(CONFIGS))
+    parser.add_argument('--workers', type=int, nargs='+',
+                        help='measure Lazy SMP scaling with these worker counts instead')
+    parser.add_argument('--movetime', type=int, default=2000,
+                        help='time per position in ms for --workers')
+    args = parser.parse_args()
+    if args.workers:
+        scaling(args.workers, args.movetime)
+    else:
+        run(args.depth, args.configs)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import multiprocessing as mp
+import time
+
+from engine import GameState, Position, WHITE, BLACK, search_position
+from engine.book import write_book, DEFAULT_BOOK_PATH
+
+# Builds the opening book offline. For each side the book plays, the tree
+# covers every opponent reply and only the book's own move, up to --plies
+# plies. The human always moves first in the game, so both start positions
+# (White and Black to move) are roots.
+
+search_game = None
+
+def search_book_position(args):
+    # Runs in a pool process; one GameState (and TT) per process
+    global search_game
+    white, black, side, depth = args
+    if search_game is None:
+        search_game = GameState()
+        search_game.reset_game()
+    pos = Position(white, black, side)
+    move, completed_depth, score = search_position(search_game, pos, max_depth=depth)
+    return pos.hash, move, score, completed_depth
+
+def start_positions():
+    game = GameState()
+    game.reset_game()
+    white = Position.from_game(game)
+    black = white.copy()
+    black.side = BLACK
+    black.hash = black.compute_hash()
+    return [white, black]
+
+def build(plies, depth, workers):
+    entries = {}
+    # (position, side the book plays) pairs of the current ply
+    frontier = [(pos, book_side) for pos in start_positions() for book_side in (WHITE, BLACK)]
+
+    with mp.Pool(workers) as pool:
+        for ply in range(plies):
+            todo = {}
+            for pos, book_side in frontier:
+                if pos.side == book_side and pos.hash not in entries:
+                    todo[pos.hash] = (pos.bb[WHITE], pos.bb[BLACK], pos.side, depth)
+            start = time.time()
+            for key, move, score, completed_depth in pool.imap_unordered(search_book_position, todo.values()):
+                if move is not None:
+                    entries[key] = (move, score, completed_depth)
+            print(f"ply {ply}: {len(todo)} positions searched in {time.time() - start:.1f}s, "
+                  f"{len(entries)} book entries")
+
+            next_frontier = {}
+            for pos, book_side in frontier:
+                if pos.is_terminal():
+                    continue
+                if pos.side == book_side:
+                    entry = entries.get(pos.hash)
+                    moves = [entry[0]] if entry is not None else []
+                else:
+                    moves = pos.generate_moves()
+                for move in moves:
+                    pos.make_move(move)
+                    child = pos.copy()
+                    pos.unmake_move()
+                    next_frontier[(child.hash, book_side)] = (child, book_side)
+            frontier = list(next_frontier.values())
+    return entries
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the Fianco opening book')
+    parser.add_argument('--plies', type=int, default=4, help='book depth in plies from the start position')
+    parser.add_argument('--depth', type=int, default=6, help='search depth per book position')
+    parser.add_argument('--workers', type=int, default=mp.cpu_count(), help='search processes')
+    parser.add_argument('--output', default=DEFAULT_BOOK_PATH)
+    args = parser.parse_args()
+
+    entries = build(args.plies, args.depth, args.workers)
+    write_book(args.output, entries)
+    print(f"wrote {len(entries)} entries to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+import argparse
+import multiprocessing as mp
+import time
+
+import numpy as np
+
+from engine.tablebase import generate_tablebases, DEFAULT_TB_PATH, MAX_TB_PIECES
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate Fianco endgame tablebases by retrograde analysis')
+    parser.add_argument('--pieces', type=int, default=2, choices=range(1, MAX_TB_PIECES + 1),
+                        help='most pieces per side')
+    parser.add_argument('--max-total', type=int, default=3,
+                        help='most pieces on the board; 2v2 takes minutes on many cores, more takes hours')
+    parser.add_argument('--workers', type=int, default=mp.cpu_count(), help='generator processes')
+    parser.add_argument('--output', default=DEFAULT_TB_PATH, help='tablebase directory')
+    args = parser.parse_args()
+
+    start = time.time()
+    for white_count, black_count, values in generate_tablebases(args.output, args.pieces, args.max_total,
+                                                                args.workers):
+        wins = int(np.count_nonzero(values > 0))
+        losses = int(np.count_nonzero(values < 0))
+        print(f"{white_count}v{black_count}: {len(values)} entries, {wins} wins, {losses} losses, "
+              f"longest {int(values.max(initial=0))} plies, {time.time() - start:.1f}s")
+
+if __name__ == '__main__':
+    main()
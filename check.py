@@ -1,13 +1,13 @@
 import pygame
 import sys
-import time
 
 from board import (
     BOARD_SIZE, TILE_SIZE, BOARD_OFFSET_X, BOARD_OFFSET_Y,
     SCOREBOARD_WIDTH, WIDTH, HEIGHT, FPS,
-    WOOD_COLOR, BLACK, WHITE, ERROR_OVERLAY_COLOR, Piece
+    WOOD_COLOR, BLACK, WHITE, ERROR_OVERLAY_COLOR, PLAYER_COLORS, piece_center, draw_piece
 )
 from ui import Button
+from engine import GameState, PLAYERS, has_capture_moves
 
 pygame.init()
 
@@ -15,17 +15,14 @@ FONT_SMALL = pygame.font.SysFont('Arial', 20)
 FONT_MEDIUM = pygame.font.SysFont('Arial', 28)
 FONT_LARGE = pygame.font.SysFont('Arial', 54)
 
-PLAYERS = {
-    'Player1': {'name': 'White', 'color': WHITE},
-    'Player2': {'name': 'Black', 'color': BLACK}
-}
-
 def quit_game():
     pygame.quit()
     sys.exit()
 
-class Fianco:
+class Fianco(GameState):
     def __init__(self):
+        # Human vs Human never searches: a minimal transposition table
+        super().__init__(hash_mb=0)
         self.window = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption('FIANCO GAME (Human vs Human Test)')
         self.clock = pygame.time.Clock()
@@ -35,20 +32,9 @@ class Fianco:
 
         self.create_buttons()
 
-        self.pieces = []
-        self.selected_piece = None
-        self.current_player = 'Player1'
-        self.game_over = False
         self.error_message = ''
         self.show_error = False
-        self.winner = None
-        self.winner_name = ''
-        self.must_continue_capture = False
-
-        self.captured_white = []
-        self.captured_black = []
 
-        self.player_times = {'Player1': 600000, 'Player2': 600000}
         self.last_update_time = pygame.time.get_ticks()
 
         self.stats_printed = False
@@ -160,22 +146,6 @@ class Fianco:
         self.show_error = False
         self.error_message = ''
 
-    def create_initial_pieces(self):
-        self.pieces = []
-        # Player1 (White)
-        for col in range(BOARD_SIZE):
-            self.pieces.append(Piece(0, col, PLAYERS['Player1']['color'], 'Player1'))
-        for i in range(1, 4):
-            self.pieces.append(Piece(i, i, PLAYERS['Player1']['color'], 'Player1'))
-            self.pieces.append(Piece(i, BOARD_SIZE - 1 - i, PLAYERS['Player1']['color'], 'Player1'))
-
-        # Player2 (Black)
-        for col in range(BOARD_SIZE):
-            self.pieces.append(Piece(BOARD_SIZE - 1, col, PLAYERS['Player2']['color'], 'Player2'))
-        for i in range(1, 4):
-            self.pieces.append(Piece(BOARD_SIZE - 1 - i, i, PLAYERS['Player2']['color'], 'Player2'))
-            self.pieces.append(Piece(BOARD_SIZE - 1 - i, BOARD_SIZE - 1 - i, PLAYERS['Player2']['color'], 'Player2'))
-
     def draw_board(self):
         self.window.fill(WOOD_COLOR)
         for row in range(BOARD_SIZE + 1):
@@ -195,18 +165,17 @@ class Fianco:
 
 
         if self.selected_piece:
-            x = self.selected_piece.x
-            y = self.selected_piece.y
+            x, y = piece_center(self.selected_piece)
             radius = TILE_SIZE // 2 - 5
             pygame.draw.circle(self.window, (255, 215, 0), (x, y), radius + 3, 3)
 
         for piece in self.pieces:
-            piece.draw(self.window)
+            draw_piece(self.window, piece)
 
         self.draw_captured_pieces()
 
         player_info = PLAYERS[self.current_player]
-        turn_text = FONT_MEDIUM.render(f"{player_info['name']}'s Turn", True, player_info['color'])
+        turn_text = FONT_MEDIUM.render(f"{player_info['name']}'s Turn", True, PLAYER_COLORS[self.current_player])
         turn_rect = turn_text.get_rect(
             center=(BOARD_OFFSET_X + (BOARD_SIZE * TILE_SIZE) // 2,
                     BOARD_OFFSET_Y + BOARD_SIZE * TILE_SIZE + 30))
@@ -222,7 +191,7 @@ class Fianco:
             radius = TILE_SIZE // 3
             if y + radius > BOARD_OFFSET_Y + BOARD_SIZE * TILE_SIZE:
                 break
-            pygame.draw.circle(self.window, PLAYERS['Player1']['color'], (x, y), radius)
+            pygame.draw.circle(self.window, PLAYER_COLORS['Player1'], (x, y), radius)
 
         # Black captured
         start_x_black = BOARD_OFFSET_X + BOARD_SIZE * TILE_SIZE + (BOARD_OFFSET_X // 2)
@@ -233,7 +202,7 @@ class Fianco:
             radius = TILE_SIZE // 3
             if y + radius > BOARD_OFFSET_Y + BOARD_SIZE * TILE_SIZE:
                 break
-            pygame.draw.circle(self.window, PLAYERS['Player2']['color'], (x, y), radius)
+            pygame.draw.circle(self.window, PLAYER_COLORS['Player2'], (x, y), radius)
 
     def draw_timers(self):
         sidebar_x = BOARD_OFFSET_X * 2 + BOARD_SIZE * TILE_SIZE + 10
@@ -293,12 +262,6 @@ class Fianco:
 
         close_button.draw(self.window)
 
-    def get_piece_at_position(self, row, col):
-        for p in self.pieces:
-            if p.row == row and p.col == col:
-                return p
-        return None
-
     def get_mouse_board_position(self, pos):
         x, y = pos
         x -= BOARD_OFFSET_X
@@ -307,145 +270,19 @@ class Fianco:
         r = y // TILE_SIZE
         return r, c
 
-    def remove_piece(self, piece):
-
-        self.pieces.remove(piece)
-        if piece.owner == 'Player1':
-            self.captured_white.append(piece)
-        else:
-            self.captured_black.append(piece)
-        piece.row = -1
-        piece.col = -1
-        piece.reset_position()
-
-    def is_valid_move(self, piece, r, c):
-        if piece.row == r and piece.col == c:
-            return False, "", None
-        if r < 0 or r >= BOARD_SIZE or c < 0 or c >= BOARD_SIZE:
-            return False, "", None
-
-        occ = self.get_piece_at_position(r, c)
-        if occ:
-            return False, "", None
-
-        if piece.owner == 'Player1':
-            fw = 1
-        else:
-            fw = -1
-
-        dr = r - piece.row
-        dc = c - piece.col
-
-        # Back move prohibited
-        if dr == -fw:
-            return False, "", None
-
-        # Normal forward
-        if dr == fw and dc == 0:
-            return True, "", None
-
-        # Side move
-        elif dr == 0 and abs(dc) == 1:
-            return True, "", None
-
-        # Capture
-        elif dr == fw * 2 and abs(dc) == 2:
-            middle_row = piece.row + fw
-            middle_col = piece.col + (dc // 2)
-            mid_piece = self.get_piece_at_position(middle_row, middle_col)
-            if mid_piece and mid_piece.owner != piece.owner:
-                return True, "", mid_piece
-
-        return False, "", None
-
-    def check_for_win(self):
-        for piece in self.pieces:
-            # White -> en alta (row = BOARD_SIZE - 1)
-            if piece.owner == 'Player1' and piece.row == BOARD_SIZE - 1:
-                return 'Player1'
-            # Black -> en üste (row = 0)
-            elif piece.owner == 'Player2' and piece.row == 0:
-                return 'Player2'
-        return None
-
-    def check_for_piece_depletion(self):
-
-        p1 = [p for p in self.pieces if p.owner == 'Player1']
-        p2 = [p for p in self.pieces if p.owner == 'Player2']
-        if not p1:
-            return 'Player2'
-        elif not p2:
-            return 'Player1'
-        return None
-
     def reset_game(self):
-
-        self.create_initial_pieces()
-        self.selected_piece = None
+        super().reset_game()
         self.current_player = self.human_player
-        self.game_over = False
         self.error_message = ''
         self.show_error = False
-        self.winner = None
-        self.winner_name = ''
-        self.must_continue_capture = False
-
-        self.captured_white.clear()
-        self.captured_black.clear()
-
-        self.player_times['Player1'] = 600000
-        self.player_times['Player2'] = 600000
         self.last_update_time = pygame.time.get_ticks()
-
         self.stats_printed = False
 
     def make_move(self, move):
-        piece, r, c, captured = move
-        piece.row = r
-        piece.col = c
-        piece.reset_position()
-
-        if captured and captured in self.pieces:
-            self.remove_piece(captured)
-
-        w = self.check_for_win()
-        if not w:
-            w = self.check_for_piece_depletion()
-
-        if w:
-            self.winner = w
-            self.game_over = True
-            self.winner_name = PLAYERS[w]['name']
+        super().make_move(move)
+        if self.game_over:
             self.state = 'winner_announce'
             self.winner_announce_start = pygame.time.get_ticks()
-        else:
-            if captured and self.has_available_captures(piece):
-                self.must_continue_capture = True
-                self.selected_piece = piece
-            else:
-                self.must_continue_capture = False
-                self.selected_piece = None
-                if not self.must_continue_capture:
-                    self.current_player = 'Player2' if self.current_player == 'Player1' else 'Player1'
-
-    def has_available_captures(self, piece):
-
-        if piece.owner == 'Player1':
-            fw = 1
-        else:
-            fw = -1
-
-        for dc in [-2, 2]:
-            nr = piece.row + fw * 2
-            nc = piece.col + dc
-            if 0 <= nr < BOARD_SIZE and 0 <= nc < BOARD_SIZE:
-                if not self.get_piece_at_position(nr, nc):
-                    mr = piece.row + fw
-                    mc = piece.col + (dc // 2)
-                    mid = self.get_piece_at_position(mr, mc)
-                    if mid and mid.owner != piece.owner:
-                        return True
-        return False
 
     def handle_event_manual(self, event):
 
@@ -463,16 +300,13 @@ class Fianco:
                     pos = pygame.mouse.get_pos()
                     if not self.selected_piece:
                         # Taş seçimi
-                        for p in self.pieces:
-                            rad = TILE_SIZE // 2 - 5
-                            dist = ((p.x - pos[0])**2 + (p.y - pos[1])**2)**0.5
-                            if dist <= rad and p.owner == self.current_player:
-                                self.selected_piece = p
-                                break
+                        p = self.get_piece_at_position(*self.get_mouse_board_position(pos))
+                        if p and p.owner == self.current_player:
+                            self.selected_piece = p
                     else:
                         # Taşı oynama
                         rr, cc = self.get_mouse_board_position(pos)
-                        all_capture_moves = self.get_all_possible_capture_moves(self.current_player)
+                        capture_available = has_capture_moves(self, self.current_player)
 
                         if 0 <= rr < BOARD_SIZE and 0 <= cc < BOARD_SIZE:
                             clicked_piece = self.get_piece_at_position(rr, cc)
@@ -483,7 +317,7 @@ class Fianco:
                                 is_ok, _, cap = self.is_valid_move(self.selected_piece, rr, cc)
                                 if is_ok:
                                     # Zorunlu yeme varsa ama bu hamlede yeme yoksa hata
-                                    if all_capture_moves and cap is None:
+                                    if capture_available and cap is None:
                                         self.error_message = 'Capture is mandatory!'
                                         self.show_error = True
                                         self.error_start_time = pygame.time.get_ticks()
@@ -501,28 +335,6 @@ class Fianco:
             self.game_over_restart_button.handle_event(event)
             self.game_over_quit_button.handle_event(event)
 
-    def get_all_possible_capture_moves(self, player):
-
-        capture_moves = []
-        for piece in self.pieces:
-            if piece.owner == player:
-                if piece.row < 0 or piece.col < 0:
-                    continue
-
-                if piece.owner == 'Player1':
-                    fw = 1
-                else:
-                    fw = -1
-
-                for dc in [2, -2]:
-                    r_new = piece.row + fw * 2
-                    c_new = piece.col + dc
-                    if 0 <= r_new < BOARD_SIZE and 0 <= c_new < BOARD_SIZE:
-                        is_ok, _, cap = self.is_valid_move(piece, r_new, c_new)
-                        if is_ok and cap is not None:
-                            capture_moves.append((piece, r_new, c_new, cap))
-        return capture_moves
-
 def main():
     game = Fianco()
 
@@ -566,7 +378,7 @@ def main():
 
         elif game.state == 'winner_announce':
             game.window.fill(WOOD_COLOR)
-            announce_text = FONT_LARGE.render(f"{game.winner_name} Wins!", True, PLAYERS[game.winner]['color'])
+            announce_text = FONT_LARGE.render(f"{game.winner_name} Wins!", True, PLAYER_COLORS[game.winner])
             announce_rect = announce_text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
             game.window.blit(announce_text, announce_rect)
 
@@ -0,0 +1,20 @@
+# Headless Fianco engine: rules, bitboard position, hashing and search.
+# Nothing in this package imports pygame.
+from .bitboard import (
+    Position, WHITE, BLACK, NO_SQUARE, NUM_SQUARES, PLAYER_IDS,
+    STEP_TARGETS, JUMP_TARGETS,
+    square, popcount, iter_squares
+)
+from .piece import BOARD_SIZE, Piece
+from .state import GameState, PLAYERS, other_player
+from .ttable import TranspositionTable, DEFAULT_HASH_MB, REPLACE_POLICIES
+from .zobrist import ZOBRIST, ZOBRIST_SEED, owner_to_id, initialize_zobrist, zobrist_signature, get_board_hash
+from .search import (
+    iter_capture_moves, iter_quiet_moves, iter_moves, has_capture_moves,
+    evaluate_position, order_moves, negamax,
+    search_position, iterative_deepening, SearchAborted
+)
+from .smp import SearchPool, parallel_search, close_search_pool
+from .book import OpeningBook, DEFAULT_BOOK_PATH, write_book
+from .tablebase import Tablebase, DEFAULT_TB_PATH, generate_tablebases
+from .cache import SearchCache, DEFAULT_CACHE_PATH, save_search_cache
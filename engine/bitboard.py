@@ -0,0 +1,341 @@
+from .piece import BOARD_SIZE
+from .zobrist import ZOBRIST, CONT_BASE, SIDE_INDEX
+
+# --- Bitboard layout ---
+# Square index = row * BOARD_SIZE + col, one 81-bit int per side.
+WHITE = 0   # Player1, moves towards the last row
+BLACK = 1   # Player2, moves towards row 0
+NO_SQUARE = -1
+
+NUM_SQUARES = BOARD_SIZE * BOARD_SIZE
+ROW_MASKS = [((1 << BOARD_SIZE) - 1) << (row * BOARD_SIZE) for row in range(BOARD_SIZE)]
+GOAL_ROWS = (ROW_MASKS[BOARD_SIZE - 1], ROW_MASKS[0])
+FORWARD = (1, -1)
+
+# Undo stack: fixed-width records, preallocated for MAX_PLY moves
+#   [from_sq, to_sq, captured mask, hash delta, side | (cont + 1) << 1 | quiet_run << 8]
+UNDO_WIDTH = 5
+MAX_PLY = 128
+
+PLAYER_IDS = {'Player1': WHITE, 'Player2': BLACK}
+
+
+def square(row, col):
+    return row * BOARD_SIZE + col
+
+
+def build_move_tables():
+    # STEP_TARGETS[side][sq]: destinations of forward and sideways steps
+    # JUMP_TARGETS[side][sq]: (jumped square, landing square) pairs
+    steps = ([], [])
+    jumps = ([], [])
+    for side in (WHITE, BLACK):
+        fw = FORWARD[side]
+        for sq in range(NUM_SQUARES):
+            r, c = divmod(sq, BOARD_SIZE)
+            targets = []
+            for dr, dc in ((fw, 0), (0, 1), (0, -1)):
+                if 0 <= r + dr < BOARD_SIZE and 0 <= c + dc < BOARD_SIZE:
+                    targets.append(square(r + dr, c + dc))
+            steps[side].append(tuple(targets))
+
+            pairs = []
+            for dc in (2, -2):
+                if 0 <= r + 2 * fw < BOARD_SIZE and 0 <= c + dc < BOARD_SIZE:
+                    pairs.append((square(r + fw, c + dc // 2), square(r + 2 * fw, c + dc)))
+            jumps[side].append(tuple(pairs))
+    return steps, jumps
+
+
+STEP_TARGETS, JUMP_TARGETS = build_move_tables()
+
+# ADVANCE[side][sq]: rows the piece on sq has advanced from its own base row
+ADVANCE = (
+    tuple(sq // BOARD_SIZE for sq in range(NUM_SQUARES)),
+    tuple(BOARD_SIZE - 1 - sq // BOARD_SIZE for sq in range(NUM_SQUARES)),
+)
+
+
+def popcount(mask):
+    return bin(mask).count('1')
+
+
+def iter_squares(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class Position:
+    # Moves are (from_sq, to_sq, captured) tuples. captured is a bitmask of the
+    # jumped squares, 0 for quiet moves; a capture move is a whole jump chain,
+    # so the side to move changes after every move.
+    __slots__ = ('bb', 'side', 'cont', 'hash', 'count', 'advance', 'undo', 'ply',
+                 'history', 'quiet_run')
+
+    def __init__(self, white=0, black=0, side=WHITE, cont=NO_SQUARE):
+        self.bb = [white, black]
+        self.side = side
+        # Square of the piece that has to keep capturing, NO_SQUARE otherwise
+        self.cont = cont
+        self.hash = self.compute_hash()
+        # Evaluation terms per side, kept up to date by make/unmake
+        self.count = [0, 0]
+        self.advance = [0, 0]
+        self.compute_counters()
+        self.undo = [0] * (UNDO_WIDTH * MAX_PLY)
+        self.ply = 0
+        # Hashes of the positions before each move, game moves included, and
+        # the number of sideways moves since the last irreversible one
+        self.history = []
+        self.quiet_run = 0
+
+    @classmethod
+    def from_game(cls, game):
+        pos = cls(side=PLAYER_IDS[game.current_player])
+        for p in game.pieces:
+            if p.row < 0 or p.col < 0:
+                continue
+            pos.bb[PLAYER_IDS[p.owner]] |= 1 << square(p.row, p.col)
+        if game.must_continue_capture and game.selected_piece is not None:
+            pos.cont = square(game.selected_piece.row, game.selected_piece.col)
+        pos.hash = pos.compute_hash()
+        pos.compute_counters()
+        pos.history = list(game.position_history)
+        pos.quiet_run = len(pos.history)
+        return pos
+
+    def to_game_moves(self, game, move):
+        # A move as the list of single steps GameState.make_move plays, one per jump
+        frm, to, caps = move
+        piece = game.get_piece_at_position(*divmod(frm, BOARD_SIZE))
+        if not caps:
+            return [(piece, *divmod(to, BOARD_SIZE), None)]
+        steps = []
+        sq = frm
+        while sq != to:
+            for mid, nxt in JUMP_TARGETS[self.side][sq]:
+                if (caps >> mid) & 1:
+                    captured = game.get_piece_at_position(*divmod(mid, BOARD_SIZE))
+                    steps.append((piece, *divmod(nxt, BOARD_SIZE), captured))
+                    sq = nxt
+                    break
+        return steps
+
+    def copy(self):
+        pos = Position(self.bb[WHITE], self.bb[BLACK], self.side, self.cont)
+        pos.history = list(self.history)
+        pos.quiet_run = self.quiet_run
+        return pos
+
+    def compute_counters(self):
+        for side in (WHITE, BLACK):
+            self.count[side] = popcount(self.bb[side])
+            self.advance[side] = sum(ADVANCE[side][sq] for sq in iter_squares(self.bb[side]))
+
+    def most_advanced(self, side):
+        # Rows advanced by the leading piece of side, -1 without pieces
+        mask = self.bb[side]
+        if not mask:
+            return -1
+        if side == WHITE:
+            return (mask.bit_length() - 1) // BOARD_SIZE
+        return BOARD_SIZE - 1 - ((mask & -mask).bit_length() - 1) // BOARD_SIZE
+
+    def compute_hash(self):
+        # From scratch; make_move keeps self.hash up to date incrementally
+        h = 0
+        for side in (WHITE, BLACK):
+            base = side * NUM_SQUARES
+            for sq in iter_squares(self.bb[side]):
+                h ^= ZOBRIST[base + sq]
+        if self.cont != NO_SQUARE:
+            h ^= ZOBRIST[CONT_BASE + self.cont]
+        if self.side == BLACK:
+            h ^= ZOBRIST[SIDE_INDEX]
+        return h
+
+    # --- Move generation ---
+    # Staged: captures are generated first and, because capturing is
+    # mandatory, quiet moves are only generated when there is none.
+    def iter_chains(self, frm):
+        # Complete jump chains of the piece on frm. A chain only ends when the
+        # piece cannot capture again; jumps always go forward, so a chain that
+        # reaches the goal row or takes the last piece ends there as well.
+        side = self.side
+        opp = self.bb[side ^ 1]
+        occ = self.bb[side] | opp
+        jumps = JUMP_TARGETS[side]
+        stack = [(frm, 0)]
+        while stack:
+            sq, caps = stack.pop()
+            extended = False
+            for mid, to in jumps[sq]:
+                if (opp >> mid) & 1 and not (occ >> to) & 1:
+                    extended = True
+                    stack.append((to, caps | (1 << mid)))
+            if caps and not extended:
+                yield frm, sq, caps
+
+    def iter_captures(self):
+        if self.cont != NO_SQUARE:
+            yield from self.iter_chains(self.cont)
+            return
+        for sq in iter_squares(self.bb[self.side]):
+            yield from self.iter_chains(sq)
+
+    def iter_quiet_moves(self):
+        side = self.side
+        occ = self.bb[WHITE] | self.bb[BLACK]
+        steps = STEP_TARGETS[side]
+        for sq in iter_squares(self.bb[side]):
+            for to in steps[sq]:
+                if not (occ >> to) & 1:
+                    yield sq, to, 0
+
+    def staged_moves(self):
+        # Lazy; the caller must undo any move it makes before asking for the next one
+        has_capture = False
+        for move in self.iter_captures():
+            has_capture = True
+            yield move
+        if not has_capture and self.cont == NO_SQUARE:
+            yield from self.iter_quiet_moves()
+
+    def generate_moves(self):
+        return list(self.staged_moves())
+
+    def is_legal(self, move):
+        # Cheap check for moves that did not come from this position's generator (TT moves)
+        frm, to, caps = move
+        side = self.side
+        if not (self.bb[side] >> frm) & 1:
+            return False
+        if caps:
+            if self.cont != NO_SQUARE and frm != self.cont:
+                return False
+            return move in self.iter_chains(frm)
+        if self.cont != NO_SQUARE or to not in STEP_TARGETS[side][frm]:
+            return False
+        if ((self.bb[WHITE] | self.bb[BLACK]) >> to) & 1:
+            return False
+        return next(self.iter_captures(), None) is None
+
+    # --- Make / unmake ---
+    def make_move(self, move):
+        # One hash update and one undo record for the whole jump chain
+        frm, to, caps = move
+        side = self.side
+        old_hash = self.hash
+
+        undo = self.undo
+        i = self.ply * UNDO_WIDTH
+        if i == len(undo):
+            undo.extend([0] * (UNDO_WIDTH * MAX_PLY))
+        undo[i] = frm
+        undo[i + 1] = to
+        undo[i + 2] = caps
+        undo[i + 4] = side | ((self.cont + 1) << 1) | (self.quiet_run << 8)
+        self.ply += 1
+        self.history.append(old_hash)
+        # Forward steps and captures can never be undone, sideways steps can
+        if not caps and (to - frm == 1 or frm - to == 1):
+            self.quiet_run += 1
+        else:
+            self.quiet_run = 0
+
+        base = side * NUM_SQUARES
+        h = self.hash ^ ZOBRIST[base + frm] ^ ZOBRIST[base + to]
+        self.bb[side] ^= (1 << frm) | (1 << to)
+        self.advance[side] += ADVANCE[side][to] - ADVANCE[side][frm]
+        if caps:
+            opp = side ^ 1
+            base = opp * NUM_SQUARES
+            advance = ADVANCE[opp]
+            self.bb[opp] ^= caps
+            for sq in iter_squares(caps):
+                self.count[opp] -= 1
+                self.advance[opp] -= advance[sq]
+                h ^= ZOBRIST[base + sq]
+        if self.cont != NO_SQUARE:
+            h ^= ZOBRIST[CONT_BASE + self.cont]
+            self.cont = NO_SQUARE
+
+        self.side = side ^ 1
+        h ^= ZOBRIST[SIDE_INDEX]
+
+        self.hash = h
+        undo[i + 3] = old_hash ^ h
+
+    def unmake_move(self):
+        self.ply -= 1
+        undo = self.undo
+        i = self.ply * UNDO_WIDTH
+        frm = undo[i]
+        to = undo[i + 1]
+        caps = undo[i + 2]
+        flags = undo[i + 4]
+
+        side = flags & 1
+        self.side = side
+        self.cont = ((flags >> 1) & 127) - 1
+        self.quiet_run = flags >> 8
+        self.history.pop()
+        self.hash ^= undo[i + 3]
+        self.bb[side] ^= (1 << frm) | (1 << to)
+        self.advance[side] += ADVANCE[side][frm] - ADVANCE[side][to]
+        if caps:
+            opp = side ^ 1
+            advance = ADVANCE[opp]
+            self.bb[opp] ^= caps
+            for sq in iter_squares(caps):
+                self.count[opp] += 1
+                self.advance[opp] += advance[sq]
+
+    def make_null_move(self):
+        # Passes the turn, for null-move pruning; never with a capture pending.
+        # Repetitions are not looked for across a null move.
+        i = self.ply * UNDO_WIDTH
+        if i == len(self.undo):
+            self.undo.extend([0] * (UNDO_WIDTH * MAX_PLY))
+        self.undo[i + 4] = self.quiet_run
+        self.ply += 1
+        self.history.append(self.hash)
+        self.quiet_run = 0
+        self.side ^= 1
+        self.hash ^= ZOBRIST[SIDE_INDEX]
+
+    def unmake_null_move(self):
+        self.ply -= 1
+        self.quiet_run = self.undo[self.ply * UNDO_WIDTH + 4]
+        self.history.pop()
+        self.side ^= 1
+        self.hash ^= ZOBRIST[SIDE_INDEX]
+
+    def repetitions(self):
+        # Earlier occurrences of this position with the same side to move,
+        # back to the last irreversible move
+        history = self.history
+        h = self.hash
+        n = 0
+        for i in range(len(history) - 2, len(history) - self.quiet_run - 1, -2):
+            if history[i] == h:
+                n += 1
+        return n
+
+    # --- Terminal detection ---
+    def winner(self):
+        white, black = self.bb
+        if white & GOAL_ROWS[WHITE]:
+            return WHITE
+        if black & GOAL_ROWS[BLACK]:
+            return BLACK
+        if not self.count[WHITE]:
+            return BLACK
+        if not self.count[BLACK]:
+            return WHITE
+        return None
+
+    def is_terminal(self):
+        return self.winner() is not None
@@ -0,0 +1,70 @@
+import mmap
+
+import numpy as np
+
+from .ttable import encode_move, decode_move
+from .zobrist import zobrist_signature
+
+# Opening book file: a 16-byte header (magic, Zobrist key signature) and
+# 16-byte entries sorted by position hash, one entry per position. The file
+# is memory-mapped and binary-searched, so opening it reads nothing and a
+# probe touches only the pages on its search path.
+BOOK_MAGIC = b'FNCBOOK1'
+BOOK_DTYPE = np.dtype([
+    ('key', '<u8'),
+    ('score', '<i4'),
+    ('move', '<u2'),
+    ('depth', '<u2'),
+])
+HEADER_DTYPE = np.dtype([('magic', 'S8'), ('signature', '<u8')])
+DEFAULT_BOOK_PATH = 'fianco.book'
+
+
+def write_book(path, entries):
+    # entries: hash -> (move, score, depth)
+    table = np.zeros(len(entries), dtype=BOOK_DTYPE)
+    for i, (key, (move, score, depth)) in enumerate(entries.items()):
+        table[i] = (key, score, encode_move(move), depth)
+    table.sort(order='key')
+
+    header = np.array([(BOOK_MAGIC, zobrist_signature())], dtype=HEADER_DTYPE)
+    with open(path, 'wb') as f:
+        f.write(header.tobytes())
+        f.write(table.tobytes())
+
+
+class OpeningBook:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # Parsed from a copy, so the map can be closed on an error
+        header = np.frombuffer(bytes(self.map[:HEADER_DTYPE.itemsize]).ljust(HEADER_DTYPE.itemsize, b'\0'),
+                               dtype=HEADER_DTYPE)[0]
+        error = None
+        if header['magic'] != BOOK_MAGIC:
+            error = f"{path} is not an opening book"
+        elif int(header['signature']) != zobrist_signature():
+            error = f"{path} was built with different Zobrist keys"
+        elif (len(self.map) - HEADER_DTYPE.itemsize) % BOOK_DTYPE.itemsize:
+            error = f"{path} is truncated"
+        if error is not None:
+            self.map.close()
+            raise ValueError(error)
+        self.table = np.frombuffer(self.map, dtype=BOOK_DTYPE, offset=HEADER_DTYPE.itemsize)
+        self.keys = self.table['key']
+
+    def __len__(self):
+        return len(self.table)
+
+    def probe(self, key):
+        # -> (move, score, depth) or None
+        i = int(self.keys.searchsorted(np.uint64(key)))
+        if i == len(self.table) or self.keys.item(i) != key:
+            return None
+        entry = self.table[i]
+        return decode_move(int(entry['move'])), int(entry['score']), int(entry['depth'])
+
+    def close(self):
+        self.table = None
+        self.keys = None
+        self.map.close()
@@ -0,0 +1,124 @@
+import mmap
+import os
+
+import numpy as np
+
+from .ttable import decode_move
+from .zobrist import zobrist_signature
+
+# Persistent search cache: the deep entries of the transposition table,
+# kept in a file across sessions. Like the opening book it is a 16-byte
+# header (magic, Zobrist key signature) and 16-byte entries sorted by
+# position hash, memory-mapped on the first probe and binary-searched.
+# Entries are merged in from the table in one rewrite at the end of a game;
+# for a position already in the file the deeper result is kept.
+CACHE_MAGIC = b'FNCCACH1'
+CACHE_DTYPE = np.dtype([
+    ('key', '<u8'),
+    ('score', '<i4'),
+    ('move', '<u2'),
+    ('depth', 'i1'),
+    ('flag', 'u1'),
+])
+HEADER_DTYPE = np.dtype([('magic', 'S8'), ('signature', '<u8')])
+DEFAULT_CACHE_PATH = 'fianco.cache'
+CACHE_MIN_DEPTH = 4           # shallower results are cheaper to search again
+CACHE_MAX_ENTRIES = 1 << 20   # 16 MB; the deepest entries are kept
+
+
+class SearchCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, min_depth=CACHE_MIN_DEPTH, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path
+        self.min_depth = min_depth
+        self.max_entries = max_entries
+        self.map = None
+        self.table = None
+        self.keys = None
+        self.loaded = False
+
+    def load(self):
+        self.loaded = True
+        if not os.path.exists(self.path) or os.path.getsize(self.path) <= HEADER_DTYPE.itemsize:
+            return
+        with open(self.path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # Parsed from a copy: a view into the map would keep it from closing
+        header = np.frombuffer(bytes(self.map[:HEADER_DTYPE.itemsize]), dtype=HEADER_DTYPE)[0]
+        if (header['magic'] != CACHE_MAGIC or int(header['signature']) != zobrist_signature()
+                or (len(self.map) - HEADER_DTYPE.itemsize) % CACHE_DTYPE.itemsize):
+            # Other keys or a damaged file: useless, and replaced at the next flush
+            self.close()
+            self.loaded = True
+            return
+        self.table = np.frombuffer(self.map, dtype=CACHE_DTYPE, offset=HEADER_DTYPE.itemsize)
+        self.keys = self.table['key']
+
+    def __len__(self):
+        if not self.loaded:
+            self.load()
+        return 0 if self.table is None else len(self.table)
+
+    def probe(self, key):
+        # -> (score, depth, flag, move) like TranspositionTable.probe, or None
+        if not self.loaded:
+            self.load()
+        if self.table is None:
+            return None
+        i = int(self.keys.searchsorted(np.uint64(key)))
+        if i == len(self.table) or self.keys.item(i) != key:
+            return None
+        entry = self.table[i]
+        return int(entry['score']), int(entry['depth']), int(entry['flag']), decode_move(int(entry['move']))
+
+    def flush(self, ttable):
+        # Merges the table's entries of at least min_depth into the file;
+        # returns the number of entries written
+        deep_slots = (ttable.metas >> 2 != 0) & (ttable.depths >= self.min_depth)
+        deep = ttable.table[deep_slots]
+        if not len(deep):
+            return 0
+
+        new = np.zeros(len(deep), dtype=CACHE_DTYPE)
+        new['key'] = ttable.hashes()[deep_slots]
+        for field in ('score', 'move', 'depth'):
+            new[field] = deep[field]
+        new['flag'] = deep['meta'] & 3
+
+        if not self.loaded:
+            self.load()
+        if self.table is not None:
+            new = np.concatenate([self.table, new])
+        # Deepest entry per key, then the deepest max_entries overall
+        order = np.lexsort((-new['depth'].astype(np.int16), new['key']))
+        merged = new[order]
+        first = np.ones(len(merged), dtype=bool)
+        first[1:] = merged['key'][1:] != merged['key'][:-1]
+        merged = merged[first]
+        if len(merged) > self.max_entries:
+            keep = np.argsort(-merged['depth'].astype(np.int16), kind='stable')[:self.max_entries]
+            merged = merged[np.sort(keep)]
+
+        # Written next to the file and renamed over it, so a crash leaves the old cache
+        self.close()
+        header = np.array([(CACHE_MAGIC, zobrist_signature())], dtype=HEADER_DTYPE)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(header.tobytes())
+            f.write(merged.tobytes())
+        os.replace(tmp_path, self.path)
+        return len(merged)
+
+    def close(self):
+        # The next probe maps the file again
+        self.table = None
+        self.keys = None
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.loaded = False
+
+
+def save_search_cache(game):
+    # Called at the end of a game, with no search running
+    if game.cache is not None:
+        game.cache.flush(game.ttable)
@@ -0,0 +1,13 @@
+# Board size and the piece record of GameState. How a piece is drawn is
+# up to the front-end (board.py).
+BOARD_SIZE = 9
+
+
+class Piece:
+    __slots__ = ('row', 'col', 'owner')
+
+    def __init__(self, row, col, owner):
+        # row, col -> plain ints, -1 once the piece is captured
+        self.row = row
+        self.col = col
+        self.owner = owner
@@ -0,0 +1,564 @@
+import time
+
+from .piece import BOARD_SIZE
+from .bitboard import (
+    Position, WHITE, BLACK, NO_SQUARE, NUM_SQUARES, MAX_PLY, PLAYER_IDS,
+    STEP_TARGETS, JUMP_TARGETS, square
+)
+
+def iter_capture_moves(game, player):
+    grid = game.grid
+    jumps = JUMP_TARGETS[PLAYER_IDS[player]]
+    for piece in game.pieces:
+        if piece.owner == player:
+            if piece.row < 0 or piece.col < 0:
+                continue
+            for mid, to in jumps[square(piece.row, piece.col)]:
+                cap = grid[mid]
+                if cap is not None and cap.owner != player and grid[to] is None:
+                    r, c = divmod(to, BOARD_SIZE)
+                    yield piece, r, c, cap
+
+def iter_quiet_moves(game, player):
+    grid = game.grid
+    steps = STEP_TARGETS[PLAYER_IDS[player]]
+    for piece in game.pieces:
+        if piece.owner == player:
+            if piece.row < 0 or piece.col < 0:
+                continue
+            for to in steps[square(piece.row, piece.col)]:
+                if grid[to] is None:
+                    r, c = divmod(to, BOARD_SIZE)
+                    yield piece, r, c, None
+
+def iter_moves(game, player):
+    # Staged: quiet moves are only generated when no capture exists (mandatory capture)
+    has_capture = False
+    for move in iter_capture_moves(game, player):
+        has_capture = True
+        yield move
+    if not has_capture:
+        yield from iter_quiet_moves(game, player)
+
+def has_capture_moves(game, player):
+    return next(iter_capture_moves(game, player), None) is not None
+
+# Evaluation weights
+PIECE_VALUE = 100
+ADVANCE_VALUE = 2      # per row advanced, summed over all pieces
+LEADER_VALUE = 5       # per row advanced by the most advanced piece
+
+def evaluate_position(pos):
+    # From White's point of view; every term is kept incrementally by Position
+    count = pos.count
+    advance = pos.advance
+    return (PIECE_VALUE * (count[WHITE] - count[BLACK])
+            + ADVANCE_VALUE * (advance[WHITE] - advance[BLACK])
+            + LEADER_VALUE * (pos.most_advanced(WHITE) - pos.most_advanced(BLACK)))
+
+KILLER_SLOTS = 2
+KILLER_SCORE = 1 << 30   # above any history score
+
+def side_evaluation(pos):
+    # evaluate_position from the point of view of the side to move
+    if pos.side == WHITE:
+        return evaluate_position(pos)
+    return -evaluate_position(pos)
+
+def order_moves(game, moves, ply):
+    # Captures first; quiet moves by killer slot, then by history score
+    captures = []
+    normal = []
+    for m in moves:
+        if m[2]:
+            captures.append(m)
+        else:
+            normal.append(m)
+
+    killers = game.killer_moves.get(ply, ())
+    history = game.history
+
+    def quiet_score(m):
+        if m in killers:
+            return KILLER_SCORE - killers.index(m)
+        return history[m[0] * NUM_SQUARES + m[1]]
+
+    normal.sort(key=quiet_score, reverse=True)
+    return captures + normal
+
+def record_cutoff(game, move, ply, depth):
+    # A quiet move that caused a beta cutoff becomes a killer and gains history
+    if move[2]:
+        return
+    killers = game.killer_moves.setdefault(ply, [])
+    if move in killers:
+        killers.remove(move)
+    killers.insert(0, move)
+    del killers[KILLER_SLOTS:]
+    game.history[move[0] * NUM_SQUARES + move[1]] += depth * depth
+
+class SearchAborted(Exception):
+    # Raised inside the tree when a node or time limit is hit
+    pass
+
+CHECK_INTERVAL = 1024   # nodes between two limit checks
+INFINITY = 999999
+ASPIRATION_MIN_DEPTH = 3
+
+# Selective search. Neither is used when the side to move has to capture,
+# nor once a side is down to ENDGAME_PIECES pieces, where a pass or a quiet
+# move can matter as much as any other (zugzwang-like races).
+ENDGAME_PIECES = 5
+LMR_MIN_DEPTH = 3
+LMR_FULL_MOVES = 3        # moves searched at full depth before reducing
+LMR_REDUCTION = 1
+NULL_MOVE_MIN_DEPTH = 3
+NULL_MOVE_REDUCTION = 2
+
+DRAW_SCORE = 0
+# Forced results: a game won at ply n of the search scores WIN_SCORE - n and
+# a lost one -(WIN_SCORE - n), so shorter wins and longer losses score
+# higher. Scores beyond WIN_BOUND are forced results; evaluations stay far below.
+WIN_SCORE = 100000
+WIN_BOUND = WIN_SCORE - 1000
+
+# Transposition table entries (engine.ttable): hash -> (score, depth, flag, best move).
+# Scores are from the point of view of the side to move in that position.
+TT_EXACT = 0
+TT_LOWER = 1    # failed high, score is a lower bound
+TT_UPPER = 2    # failed low, score is an upper bound
+
+def schedule_limit_check(game):
+    game.next_limit_check = game.nodes_searched + CHECK_INTERVAL
+    if game.search_node_limit is not None:
+        game.next_limit_check = min(game.next_limit_check, game.search_node_limit)
+
+def check_limits(game):
+    event = game.stop_event
+    if event is not None and event.is_set():
+        raise SearchAborted()
+    if game.search_node_limit is not None and game.nodes_searched >= game.search_node_limit:
+        raise SearchAborted()
+    if game.search_deadline is not None and time.time() * 1000 >= game.search_deadline:
+        raise SearchAborted()
+    schedule_limit_check(game)
+
+def search_child(game, pos, move, depth, alpha, beta):
+    # Score of `move` for the side to move in `pos`. A capture move is a whole
+    # jump chain, so the opponent is always on move in the child.
+    pos.make_move(move)
+    try:
+        score = -negamax(game, pos, depth - 1, -beta, -alpha)
+    finally:
+        # also runs when SearchAborted unwinds the tree
+        pos.unmake_move()
+    return score
+
+def search_move(game, pos, move, depth, alpha, beta, full_window, reduction=0):
+    # Principal variation search: after the first move, moves are searched
+    # with a null window and only re-searched when they beat alpha.
+    # A reduced move is first searched shallower and only searched at full
+    # depth when it beats alpha there.
+    if reduction:
+        score = search_child(game, pos, move, depth - reduction, alpha, alpha + 1)
+        if score <= alpha:
+            return score
+        game.lmr_researches += 1
+    if full_window or not game.use_pvs:
+        return search_child(game, pos, move, depth, alpha, beta)
+    score = search_child(game, pos, move, depth, alpha, alpha + 1)
+    if alpha < score < beta:
+        game.pvs_researches += 1
+        score = search_child(game, pos, move, depth, alpha, beta)
+    return score
+
+def late_move_reduction(game, pos, move, depth, move_index, ply):
+    # Late quiet moves are reduced. Quiet moves only exist when there is no
+    # capture, so a mandatory capture is never reduced.
+    if not game.use_lmr or depth < LMR_MIN_DEPTH or move_index < LMR_FULL_MOVES:
+        return 0
+    if move[2] or move in game.killer_moves.get(ply, ()):
+        return 0
+    if min(pos.count) <= ENDGAME_PIECES:
+        return 0
+    return LMR_REDUCTION
+
+def null_move_allowed(game, pos, depth, beta):
+    if not game.use_null_move or depth < NULL_MOVE_MIN_DEPTH:
+        return False
+    if min(pos.count) <= ENDGAME_PIECES or pos.cont != NO_SQUARE:
+        return False
+    if next(pos.iter_captures(), None) is not None:
+        return False
+    return side_evaluation(pos) >= beta
+
+def terminal_score(pos):
+    # Game over: won or lost for the side to move, ply plies from the root
+    if pos.winner() == pos.side:
+        return WIN_SCORE - pos.ply
+    return -(WIN_SCORE - pos.ply)
+
+def tablebase_score(value, ply):
+    # engine.tablebase value (distance from this position) -> forced result
+    # score counted from the root, like terminal_score
+    if value > 0:
+        return WIN_SCORE - ply - value
+    if value < 0:
+        return -(WIN_SCORE - ply + value + 1)
+    return DRAW_SCORE
+
+def score_to_tt(score, ply):
+    # Forced results are stored as distance from the position itself, so an
+    # entry stays right at any ply the position comes up again
+    if score >= WIN_BOUND:
+        return score + ply
+    if score <= -WIN_BOUND:
+        return score - ply
+    return score
+
+def score_from_tt(score, ply):
+    if score >= WIN_BOUND:
+        return score - ply
+    if score <= -WIN_BOUND:
+        return score + ply
+    return score
+
+def probe_tablebase(game, pos):
+    # Score of a position covered by the tablebases, else None
+    tablebase = game.tablebase
+    if tablebase is None or pos.count[WHITE] + pos.count[BLACK] > tablebase.max_pieces:
+        return None
+    value = tablebase.probe(pos)
+    if value is None:
+        return None
+    game.tb_hits += 1
+    return tablebase_score(value, pos.ply)
+
+def probe_tt(game, key, depth, ply):
+    # TT entry with its score relative to the root; at a deep node without a
+    # deep enough one the persistent cache is tried, and a deeper cache entry
+    # is copied into the TT
+    entry = game.ttable.probe(key)
+    if game.cache is not None and depth >= game.cache.min_depth and (entry is None or entry[1] < depth):
+        cached = game.cache.probe(key)
+        if cached is not None and (entry is None or cached[1] > entry[1]):
+            game.cache_hits += 1
+            game.ttable.store(key, *cached)
+            entry = cached
+    if entry is not None:
+        score, stored_depth, flag, move = entry
+        entry = score_from_tt(score, ply), stored_depth, flag, move
+    return entry
+
+def pv_move_at(game, ply):
+    # Move of the previous iteration's PV at this ply while the search is still on it
+    if game.follow_pv:
+        if ply < len(game.pv):
+            return game.pv[ply]
+        game.follow_pv = False
+    return None
+
+def update_pv(game, ply, move):
+    game.pv_table[ply] = (move,) + game.pv_table[ply + 1]
+
+def ordered_moves(game, pos, ply, hash_move):
+    # Previous PV move, then the TT move, then the staged generator: captures
+    # as generated, and only without captures the quiet moves, ordered by
+    # killers and history
+    first = []
+    pv_move = pv_move_at(game, ply)
+    if pv_move is not None:
+        first.append(pv_move)
+    if hash_move is not None and hash_move != pv_move and pos.is_legal(hash_move):
+        first.append(hash_move)
+
+    yield from first
+    has_capture = False
+    for move in pos.iter_captures():
+        has_capture = True
+        if move not in first:
+            yield move
+    if has_capture or pos.cont != NO_SQUARE:
+        return
+
+    for move in order_moves(game, list(pos.iter_quiet_moves()), ply):
+        if move not in first:
+            yield move
+
+def tt_store(game, pos, score, depth, alpha_orig, beta, best_move):
+    if score <= alpha_orig:
+        flag = TT_UPPER
+    elif score >= beta:
+        flag = TT_LOWER
+    else:
+        flag = TT_EXACT
+    game.ttable.store(pos.hash, score_to_tt(score, pos.ply), depth, flag, best_move)
+
+def search_root(game, pos, depth, alpha, beta):
+    game.pv_table[pos.ply] = ()
+    alpha_orig = alpha
+    entry = probe_tt(game, pos.hash, depth, pos.ply)
+    hash_move = entry[3] if entry is not None else None
+    moves = list(ordered_moves(game, pos, pos.ply, hash_move))
+
+    best_score = -INFINITY
+    best_move = None
+
+    for move in moves:
+        score = search_move(game, pos, move, depth, alpha, beta, best_move is None)
+        game.follow_pv = False
+
+        if score > best_score:
+            best_score = score
+            best_move = move
+            game.root_best_move = move
+        if best_score > alpha:
+            alpha = best_score
+            update_pv(game, pos.ply, move)
+        if alpha >= beta:
+            game.prune_count += 1
+            record_cutoff(game, move, pos.ply, depth)
+            break
+
+    if best_move is not None:
+        tt_store(game, pos, best_score, depth, alpha_orig, beta, best_move)
+    return best_score, best_move
+
+def aspiration_search(game, pos, depth, prev_score):
+    # Root search in a window around the previous iteration's score; a
+    # result outside the window is re-searched with that side opened up
+    window = game.aspiration_window
+    if not window or prev_score is None or depth < ASPIRATION_MIN_DEPTH:
+        game.follow_pv = True
+        return search_root(game, pos, depth, -INFINITY, INFINITY)
+
+    alpha = prev_score - window
+    beta = prev_score + window
+    while True:
+        game.follow_pv = True
+        score, move = search_root(game, pos, depth, alpha, beta)
+        if score <= alpha and alpha > -INFINITY:
+            window *= 4
+            alpha = max(score - window, -INFINITY)
+        elif score >= beta and beta < INFINITY:
+            window *= 4
+            beta = min(score + window, INFINITY)
+        else:
+            return score, move
+        game.aspiration_researches += 1
+
+def start_search(game, max_nodes=None, movetime=None):
+    game.prune_count = 0
+    game.nodes_searched = 0
+    game.qnodes_searched = 0
+    game.pvs_researches = 0
+    game.aspiration_researches = 0
+    game.lmr_researches = 0
+    game.null_move_cutoffs = 0
+    game.repetition_draws = 0
+    game.tb_hits = 0
+    game.cache_hits = 0
+    game.search_node_limit = max_nodes
+    game.search_deadline = time.time() * 1000 + movetime if movetime is not None else None
+    game.root_best_move = None
+    game.follow_pv = False
+    game.pv = ()
+    game.pv_table = [()] * (MAX_PLY + 1)
+    game.ttable.new_search()
+    game.killer_moves.clear()
+    # Older history counts fade instead of dominating the new search
+    game.history = [h >> 1 for h in game.history]
+    schedule_limit_check(game)
+
+def search_position(game, pos, max_depth=None, max_nodes=None, movetime=None, first_depth=1):
+    # Iterative deepening on a Position: depth first_depth, first_depth + 1, ...
+    # until a limit is hit. Returns the best move of the last completed
+    # iteration as (move, depth, score), the move being None without legal moves.
+    start_search(game, max_nodes, movetime)
+    if max_depth is None:
+        max_depth = MAX_PLY - 1
+
+    best_move = None
+    best_score = None
+    completed_depth = 0
+    start_ms = time.time() * 1000
+
+    for depth in range(min(first_depth, max_depth), max_depth + 1):
+        try:
+            score, move = aspiration_search(game, pos, depth, best_score)
+        except SearchAborted:
+            break
+        if move is None:
+            break
+        best_move, best_score, completed_depth = move, score, depth
+        game.pv = game.pv_table[0]
+
+        # A forced win is proven; deeper iterations would find the same one
+        if score >= WIN_BOUND:
+            break
+
+        # Another iteration takes longer than all previous ones together
+        if movetime is not None and (time.time() * 1000 - start_ms) * 2 > movetime:
+            break
+
+    if best_move is None:
+        # Not even the first iteration finished: best root move so far, else any legal move
+        best_move = game.root_best_move
+        if best_move is None:
+            best_move = next(pos.staged_moves(), None)
+
+    return best_move, completed_depth, best_score
+
+def iterative_deepening(game, max_depth=None, max_nodes=None, movetime=None):
+    # Searches depth 1, 2, ... until a limit is hit and returns the best move
+    # of the last completed iteration, as (game moves, depth, score). The
+    # game moves are the single steps of the move, more than one for a jump chain.
+    pos = Position.from_game(game)
+    move, depth, score = search_position(game, pos, max_depth, max_nodes, movetime)
+    if move is None:
+        return None, 0, None
+    return pos.to_game_moves(game, move), depth, score
+
+def negamax(game, pos, depth, alpha, beta, allow_null=True):
+    ply = pos.ply
+    game.pv_table[ply] = ()
+
+    game.nodes_searched += 1
+    if game.nodes_searched >= game.next_limit_check:
+        check_limits(game)
+
+    # A repeated position is a draw. It depends on the path, not only on the
+    # position, so it is checked before the TT and never stored there.
+    if game.repetition_limit and pos.quiet_run >= 4 and pos.repetitions() >= game.repetition_limit:
+        game.repetition_draws += 1
+        return DRAW_SCORE
+
+    # TT Access: a deep enough entry narrows the window, and its move is tried first
+    board_hash = pos.hash
+    game.tt_accesses += 1
+    alpha_orig = alpha
+    hash_move = None
+
+    entry = probe_tt(game, board_hash, depth, ply)
+    if entry is not None:
+        stored_score, stored_depth, stored_flag, hash_move = entry
+        if stored_depth >= depth:
+            if stored_flag == TT_EXACT:
+                return stored_score
+            if stored_flag == TT_LOWER:
+                if stored_score > alpha:
+                    alpha = stored_score
+            elif stored_score < beta:
+                beta = stored_score
+            if alpha >= beta:
+                return stored_score
+
+    if pos.is_terminal():
+        score = terminal_score(pos)
+        # Save to TT
+        game.ttable.store(board_hash, score_to_tt(score, ply), depth, TT_EXACT, None)
+        return score
+
+    # Endgame tablebases replace the whole subtree with one lookup
+    tb_score = probe_tablebase(game, pos)
+    if tb_score is not None:
+        return tb_score
+
+    if depth <= 0:
+        if not game.use_quiescence:
+            eval_score = side_evaluation(pos)
+            game.ttable.store(board_hash, eval_score, 0, TT_EXACT, None)
+            return eval_score
+        score = quiescence(game, pos, alpha, beta)
+        tt_store(game, pos, score, 0, alpha_orig, beta, None)
+        return score
+
+    # Null move: if passing still fails high at reduced depth, a real move will
+    # too. Not twice in a row, and never on the previous PV.
+    if allow_null and not game.follow_pv and null_move_allowed(game, pos, depth, beta):
+        pos.make_null_move()
+        try:
+            score = -negamax(game, pos, depth - 1 - NULL_MOVE_REDUCTION, -beta, -beta + 1, False)
+        finally:
+            pos.unmake_null_move()
+        if score >= beta:
+            game.null_move_cutoffs += 1
+            # A win found after passing is not a forced one
+            return beta if score >= WIN_BOUND else score
+
+    # Staged generation: captures come first, and quiet moves are only
+    # generated if there is no capture and no cutoff has happened yet.
+    # The previous iteration's PV move and the TT move go in front of them.
+    best_score = -INFINITY
+    best_move = None
+
+    for move_index, move in enumerate(ordered_moves(game, pos, ply, hash_move)):
+        reduction = late_move_reduction(game, pos, move, depth, move_index, ply)
+        score = search_move(game, pos, move, depth, alpha, beta, best_move is None, reduction)
+        game.follow_pv = False
+
+        if score > best_score:
+            best_score = score
+            best_move = move
+        if best_score > alpha:
+            alpha = best_score
+            update_pv(game, ply, move)
+        if alpha >= beta:
+            game.prune_count += 1
+            record_cutoff(game, move, ply, depth)
+            break
+
+    if best_move is None:
+        # No legal move: a draw, as in the tablebases
+        game.ttable.store(board_hash, DRAW_SCORE, depth, TT_EXACT, None)
+        return DRAW_SCORE
+
+    tt_store(game, pos, best_score, depth, alpha_orig, beta, best_move)
+    return best_score
+
+def quiescence(game, pos, alpha, beta):
+    # Resolves capture sequences at the leaves. Capturing is mandatory, so the
+    # static evaluation is only a stand-pat bound when the side to move has
+    # no capture; otherwise every capture has to be searched.
+    ply = pos.ply
+    game.pv_table[ply] = ()
+
+    game.nodes_searched += 1
+    game.qnodes_searched += 1
+    if game.nodes_searched >= game.next_limit_check:
+        check_limits(game)
+
+    if pos.is_terminal():
+        return terminal_score(pos)
+    if ply >= MAX_PLY - 1:
+        return side_evaluation(pos)
+
+    tb_score = probe_tablebase(game, pos)
+    if tb_score is not None:
+        return tb_score
+
+    captures = pos.iter_captures()
+    move = next(captures, None)
+    if move is None:
+        if next(pos.iter_quiet_moves(), None) is None:
+            return DRAW_SCORE
+        return side_evaluation(pos)
+
+    best_score = -INFINITY
+    while move is not None:
+        pos.make_move(move)
+        try:
+            score = -quiescence(game, pos, -beta, -alpha)
+        finally:
+            pos.unmake_move()
+
+        if score > best_score:
+            best_score = score
+        if best_score > alpha:
+            alpha = best_score
+        if alpha >= beta:
+            game.prune_count += 1
+            break
+        move = next(captures, None)
+
+    return best_score
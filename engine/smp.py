@@ -0,0 +1,149 @@
+import multiprocessing as mp
+import random
+from multiprocessing import shared_memory
+
+from .bitboard import Position, NUM_SQUARES
+from .search import search_position
+from .state import GameState
+from .tablebase import Tablebase
+from .ttable import TranspositionTable
+
+# Lazy SMP: every worker process runs its own iterative deepening on the same
+# position, and they only share the transposition table, which lives in
+# shared memory. Odd workers start one ply deeper and every worker seeds its
+# history table differently, so the processes spread over different parts of
+# the tree and fill the table for each other. Table writes are not locked:
+# every entry carries its hash xor its data (engine.ttable), so a probe that
+# races a store sees a miss rather than a mismatched score. Hash moves are
+# still checked with Position.is_legal before use.
+
+# Game attributes copied to the workers for every search
+SEARCH_OPTIONS = ('use_pvs', 'aspiration_window', 'use_quiescence', 'use_lmr',
+                  'use_null_move', 'repetition_limit')
+HISTORY_NOISE = 64
+
+
+def worker_main(worker_id, shm_name, size_mb, policy, tasks, results, stop_event):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    game = GameState(hash_mb=0)
+    game.ttable = TranspositionTable(size_mb, policy, buffer=shm.buf)
+    game.stop_event = stop_event
+    rng = random.Random(worker_id)
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        for key, value in task['options'].items():
+            setattr(game, key, value)
+        game.ttable.generation = task['generation']
+        if task['tablebase'] is None:
+            game.tablebase = None
+        elif game.tablebase is None or game.tablebase.directory != task['tablebase']:
+            game.tablebase = Tablebase(task['tablebase'])
+        game.history = [rng.randrange(HISTORY_NOISE) for _ in range(NUM_SQUARES * NUM_SQUARES)]
+
+        white, black, side, cont, history = task['position']
+        pos = Position(white, black, side, cont)
+        pos.history = list(history)
+        pos.quiet_run = len(history)
+        move, depth, score = search_position(game, pos, task['max_depth'], task['max_nodes'],
+                                             task['movetime'], 1 + worker_id % 2)
+        results.put((worker_id, move, depth, score, game.nodes_searched))
+
+    # The table views have to go before the shared memory can be closed
+    game.ttable = None
+    shm.close()
+
+
+class SearchPool:
+    # Helper processes for game.workers > 1, created once and reused for
+    # every move. The game's transposition table is moved into shared memory
+    # while the pool exists.
+    def __init__(self, game, workers):
+        table = game.ttable
+        self.game = game
+        self.shm = shared_memory.SharedMemory(create=True, size=table.table.nbytes)
+        shared = TranspositionTable(table.size_mb, table.policy, buffer=self.shm.buf)
+        shared.table[:] = table.table
+        shared.generation = table.generation
+        game.ttable = shared
+
+        self.stop_event = mp.Event()
+        self.results = mp.Queue()
+        self.tasks = []
+        self.processes = []
+        # worker 0 is the calling process itself
+        for worker_id in range(1, workers):
+            tasks = mp.Queue()
+            process = mp.Process(target=worker_main, daemon=True,
+                                 args=(worker_id, self.shm.name, table.size_mb, table.policy,
+                                       tasks, self.results, self.stop_event))
+            process.start()
+            self.tasks.append(tasks)
+            self.processes.append(process)
+        self.workers = workers
+
+    def search(self, pos, max_depth=None, max_nodes=None, movetime=None):
+        # -> (move, depth, score, nodes of all processes)
+        game = self.game
+        task = {
+            'position': (pos.bb[0], pos.bb[1], pos.side, pos.cont, pos.history),
+            'options': {key: getattr(game, key) for key in SEARCH_OPTIONS},
+            'generation': game.ttable.generation,
+            'tablebase': game.tablebase.directory if game.tablebase is not None else None,
+            'max_depth': max_depth,
+            'max_nodes': max_nodes,
+            'movetime': movetime,
+        }
+        self.stop_event.clear()
+        for tasks in self.tasks:
+            tasks.put(task)
+
+        best = search_position(game, pos, max_depth, max_nodes, movetime)
+        nodes = game.nodes_searched
+
+        # The main search is done, so the helpers stop and report their
+        # deepest completed iteration
+        self.stop_event.set()
+        for _ in self.processes:
+            worker_id, move, depth, score, worker_nodes = self.results.get()
+            nodes += worker_nodes
+            if move is not None and depth > best[1]:
+                best = (move, depth, score)
+        return best[0], best[1], best[2], nodes
+
+    def close(self):
+        for tasks in self.tasks:
+            tasks.put(None)
+        for process in self.processes:
+            process.join()
+
+        # Back to a private table, so the shared memory can be released
+        shared = self.game.ttable
+        table = TranspositionTable(shared.size_mb, shared.policy)
+        table.table[:] = shared.table
+        table.generation = shared.generation
+        self.game.ttable = table
+        del shared
+        self.shm.close()
+        self.shm.unlink()
+
+
+def parallel_search(game, max_depth=None, max_nodes=None, movetime=None):
+    # iterative_deepening on game.workers processes; same return value
+    if game.search_pool is None or game.search_pool.workers != game.workers:
+        close_search_pool(game)
+        game.search_pool = SearchPool(game, game.workers)
+
+    pos = Position.from_game(game)
+    move, depth, score, game.parallel_nodes = game.search_pool.search(pos, max_depth, max_nodes, movetime)
+    if move is None:
+        return None, 0, None
+    return pos.to_game_moves(game, move), depth, score
+
+
+def close_search_pool(game):
+    if game.search_pool is not None:
+        game.search_pool.close()
+        game.search_pool = None
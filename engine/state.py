@@ -0,0 +1,306 @@
+from .bitboard import NUM_SQUARES, PLAYER_IDS, JUMP_TARGETS, square
+from .ttable import TranspositionTable, DEFAULT_HASH_MB
+from .piece import BOARD_SIZE, Piece
+from .zobrist import get_board_hash
+
+PLAYERS = {
+    'Player1': {'name': 'White'},
+    'Player2': {'name': 'Black'}
+}
+
+
+def other_player(player):
+    return 'Player2' if player == 'Player1' else 'Player1'
+
+
+class GameState:
+    # Rules and search state of a Fianco game, without any pygame dependency.
+    # The pygame front-ends subclass it and add drawing and event handling.
+    def __init__(self, hash_mb=DEFAULT_HASH_MB, tt_policy='depth'):
+        self.pieces = []
+        # Occupancy grid: square -> Piece or None, kept in sync with self.pieces
+        self.grid = [None] * NUM_SQUARES
+        self.selected_piece = None
+        self.current_player = 'Player1'
+        self.game_over = False
+        self.winner = None
+        self.winner_name = ''
+        self.must_continue_capture = False
+
+        self.captured_white = []
+        self.captured_black = []
+        # Hashes of the positions before each sideways move since the last
+        # forward move or capture; the search continues this history
+        self.position_history = []
+
+        # 10 dakika (ms cinsinden)
+        self.player_times = {'Player1': 600000, 'Player2': 600000}
+        self.ai_player = None
+
+        # AI & Arama Değişkenleri
+        self.ttable = TranspositionTable(hash_mb, tt_policy)  # Transposition Table
+        self.prune_count = 0
+        self.nodes_searched = 0
+        self.total_prunes = 0
+        self.max_prune_per_move = 0
+        self.tt_accesses = 0     # TT erişim sayısı
+
+        self.killer_moves = {}   # ply -> quiet moves that caused beta cutoffs
+        self.history = [0] * (NUM_SQUARES * NUM_SQUARES)   # from * 81 + to -> cutoff score
+        # Search limits used by ai.make_ai_move; None means unlimited
+        self.iterative_time_limit = 2000
+        self.max_depth = None
+        self.max_nodes = None
+
+        # Search options
+        self.use_pvs = True             # principal variation search
+        self.aspiration_window = 50     # root window half-width, 0 disables
+        self.use_quiescence = True      # resolve captures at depth 0
+        self.use_lmr = True             # late move reductions
+        self.use_null_move = True       # null-move pruning
+        self.repetition_limit = 1       # earlier occurrences that make a draw, 0 disables
+        self.workers = 1                # search processes, see engine.smp
+        self.search_pool = None         # engine.smp.SearchPool once workers > 1
+        self.book = None                # engine.book.OpeningBook, probed before searching
+        self.tablebase = None           # engine.tablebase.Tablebase, probed in the search
+        self.cache = None               # engine.cache.SearchCache, deep results kept across sessions
+
+        # Per-search state, set up by engine.search.start_search
+        self.stop_event = None          # set by another thread or process to abort the search
+        self.parallel_nodes = 0         # nodes of all processes in the last engine.smp search
+        self.search_node_limit = None
+        self.search_deadline = None
+        self.next_limit_check = 0
+        self.qnodes_searched = 0
+        self.pvs_researches = 0
+        self.aspiration_researches = 0
+        self.lmr_researches = 0
+        self.null_move_cutoffs = 0
+        self.repetition_draws = 0
+        self.tb_hits = 0
+        self.cache_hits = 0
+        self.root_best_move = None
+        self.follow_pv = False
+        self.pv = ()
+        self.pv_table = []
+
+        # Pondering (ai.start_pondering): search thread, hash of the position
+        # it searches, its (move, depth, score) once finished and its start time in ms
+        self.use_ponder = False
+        self.ponder_thread = None
+        self.ponder_hash = None
+        self.ponder_result = None
+        self.ponder_start = 0
+
+        # Non-blocking AI move (ai.start_ai_move): search thread, its result
+        # or the exception it raised, the event that cancels it and its start time in ms
+        self.ai_thread = None
+        self.ai_result = None
+        self.ai_error = None
+        self.ai_cancel = None
+        self.ai_start = 0
+
+    def create_initial_pieces(self):
+        self.pieces = []
+        # Player1 (White)
+        for col in range(BOARD_SIZE):
+            self.pieces.append(Piece(0, col, 'Player1'))
+        for i in range(1, 4):
+            self.pieces.append(Piece(i, i, 'Player1'))
+            self.pieces.append(Piece(i, BOARD_SIZE - 1 - i, 'Player1'))
+
+        # Player2 (Black)
+        for col in range(BOARD_SIZE):
+            self.pieces.append(Piece(BOARD_SIZE - 1, col, 'Player2'))
+        for i in range(1, 4):
+            self.pieces.append(Piece(BOARD_SIZE - 1 - i, i, 'Player2'))
+            self.pieces.append(Piece(BOARD_SIZE - 1 - i, BOARD_SIZE - 1 - i, 'Player2'))
+
+        self.grid = [None] * NUM_SQUARES
+        for p in self.pieces:
+            self.grid[square(p.row, p.col)] = p
+
+    def reset_game(self):
+        self.create_initial_pieces()
+        self.selected_piece = None
+        self.current_player = 'Player1'
+        self.game_over = False
+        self.winner = None
+        self.winner_name = ''
+        self.must_continue_capture = False
+        self.captured_white.clear()
+        self.captured_black.clear()
+        self.position_history.clear()
+
+        self.player_times['Player1'] = 600000
+        self.player_times['Player2'] = 600000
+
+        self.ttable.clear()
+        self.prune_count = 0
+        self.nodes_searched = 0
+        self.total_prunes = 0
+        self.max_prune_per_move = 0
+        self.tt_accesses = 0
+        self.killer_moves.clear()
+        self.history = [0] * (NUM_SQUARES * NUM_SQUARES)
+
+    def get_piece_at_position(self, row, col):
+        if 0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE:
+            return self.grid[square(row, col)]
+        return None
+
+    def remove_piece(self, piece):
+        self.grid[square(piece.row, piece.col)] = None
+        self.pieces.remove(piece)
+        if piece.owner == 'Player1':
+            self.captured_white.append(piece)
+        else:
+            self.captured_black.append(piece)
+
+        piece.row = -1
+        piece.col = -1
+
+    def is_valid_move(self, piece, r, c):
+        if piece.row == r and piece.col == c:
+            return False, "", None
+        if r < 0 or r >= BOARD_SIZE or c < 0 or c >= BOARD_SIZE:
+            return False, "", None
+
+        occ = self.get_piece_at_position(r, c)
+        if occ:
+            return False, "", None
+
+        if piece.owner == 'Player1':
+            fw = 1
+        else:
+            fw = -1
+
+        dr = r - piece.row
+        dc = c - piece.col
+
+        # Back movement
+        if dr == -fw:
+            return False, "", None
+
+        # Normal movement
+        if dr == fw and dc == 0:
+            return True, "", None
+
+        # Side movement
+        elif dr == 0 and abs(dc) == 1:
+            return True, "", None
+
+        # Capture
+        elif dr == fw * 2 and abs(dc) == 2:
+            middle_row = piece.row + fw
+            middle_col = piece.col + (dc // 2)
+            mid_piece = self.get_piece_at_position(middle_row, middle_col)
+            if mid_piece and mid_piece.owner != piece.owner:
+                return True, "", mid_piece
+
+        return False, "", None
+
+    def check_for_win(self):
+        for piece in self.pieces:
+            if piece.owner == 'Player1' and piece.row == BOARD_SIZE - 1:
+                return 'Player1'
+            elif piece.owner == 'Player2' and piece.row == 0:
+                return 'Player2'
+        return None
+
+    def check_for_piece_depletion(self):
+        p1 = [p for p in self.pieces if p.owner == 'Player1']
+        p2 = [p for p in self.pieces if p.owner == 'Player2']
+        if not p1:
+            return 'Player2'
+        elif not p2:
+            return 'Player1'
+        return None
+
+    def make_move(self, move, store_previous_state=False):
+        piece, r, c, captured = move
+        prev = None
+        if store_previous_state:
+            prev = {
+                'piece': piece,
+                'piece_row': piece.row,
+                'piece_col': piece.col,
+                'captured_piece': captured,
+                'captured_row': captured.row if captured else None,
+                'captured_col': captured.col if captured else None,
+                'current_player': self.current_player,
+                'must_continue_capture': self.must_continue_capture,
+                'game_over': self.game_over,
+                'winner': self.winner,
+                'winner_name': self.winner_name,
+                'selected_piece': self.selected_piece,
+                'position_history': list(self.position_history)
+            }
+
+        # A sideways step is a whole turn and the only move that can be undone
+        if captured is None and r == piece.row:
+            self.position_history.append(get_board_hash(self))
+        else:
+            self.position_history.clear()
+
+        self.grid[square(piece.row, piece.col)] = None
+        piece.row = r
+        piece.col = c
+        self.grid[square(r, c)] = piece
+
+        if captured and captured.row >= 0 and self.grid[square(captured.row, captured.col)] is captured:
+            self.remove_piece(captured)
+
+        w = self.check_for_win()
+        if not w:
+            w = self.check_for_piece_depletion()
+
+        if w:
+            self.winner = w
+            self.game_over = True
+            self.winner_name = PLAYERS[w]['name']
+        else:
+            if captured and self.has_available_captures(piece):
+                self.must_continue_capture = True
+                self.selected_piece = piece
+            else:
+                self.must_continue_capture = False
+                self.selected_piece = None
+                self.current_player = other_player(self.current_player)
+
+        return prev
+
+    def unmake_move(self, prev):
+        piece = prev['piece']
+        self.grid[square(piece.row, piece.col)] = None
+        piece.row = prev['piece_row']
+        piece.col = prev['piece_col']
+        self.grid[square(piece.row, piece.col)] = piece
+
+        captured_piece = prev['captured_piece']
+        if captured_piece:
+            captured_piece.row = prev['captured_row']
+            captured_piece.col = prev['captured_col']
+            self.pieces.append(captured_piece)
+            self.grid[square(captured_piece.row, captured_piece.col)] = captured_piece
+            captured_list = self.captured_white if captured_piece.owner == 'Player1' else self.captured_black
+            # make/unmake are LIFO, so the piece is normally the last one captured
+            if captured_list and captured_list[-1] is captured_piece:
+                captured_list.pop()
+            else:
+                captured_list.remove(captured_piece)
+
+        self.current_player = prev['current_player']
+        self.must_continue_capture = prev['must_continue_capture']
+        self.game_over = prev['game_over']
+        self.winner = prev['winner']
+        self.winner_name = prev['winner_name']
+        self.selected_piece = prev['selected_piece']
+        self.position_history = prev['position_history']
+
+    def has_available_captures(self, piece):
+        grid = self.grid
+        for mid, to in JUMP_TARGETS[PLAYER_IDS[piece.owner]][square(piece.row, piece.col)]:
+            if grid[to] is None and grid[mid] and grid[mid].owner != piece.owner:
+                return True
+        return False
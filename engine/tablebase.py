@@ -0,0 +1,258 @@
+import itertools
+import multiprocessing as mp
+import os
+
+import numpy as np
+
+from .bitboard import Position, WHITE, BLACK, NO_SQUARE, NUM_SQUARES, iter_squares
+
+# Endgame tablebases: one file per material (white pieces, black pieces),
+# a 16-byte header and one int8 per position, memory-mapped when first probed.
+#   0          draw, including positions without a legal move (as in the search)
+#   v > 0      side to move wins in v plies (always odd)
+#   v < 0      side to move loses in -v - 1 plies
+# Positions that are already decided (a piece on its goal row) and
+# impossible ones (two pieces on a square) are stored as 0; the search never
+# probes them.
+#
+# Index: (side * C(81, w) + rank(white)) * C(81, b) + rank(black), where
+# rank is the combinatorial (colex) rank of the sorted square set.
+TB_MAGIC = b'FNCTBL01'
+TB_HEADER_SIZE = 16
+MAX_TB_PIECES = 4          # per side, limit of the index tables
+DEFAULT_TB_PATH = 'tablebases'
+NO_DISTANCE = 32767
+
+BINOM = [[0] * (MAX_TB_PIECES + 1) for _ in range(NUM_SQUARES + 1)]
+for n in range(NUM_SQUARES + 1):
+    BINOM[n][0] = 1
+    for k in range(1, MAX_TB_PIECES + 1):
+        BINOM[n][k] = BINOM[n - 1][k - 1] + BINOM[n - 1][k] if n else 0
+
+
+def combo_rank(mask):
+    rank = 0
+    for i, sq in enumerate(iter_squares(mask)):
+        rank += BINOM[sq][i + 1]
+    return rank
+
+
+def table_size(white_count, black_count):
+    return 2 * BINOM[NUM_SQUARES][white_count] * BINOM[NUM_SQUARES][black_count]
+
+
+def table_path(directory, white_count, black_count):
+    return os.path.join(directory, f"{white_count}v{black_count}.tb")
+
+
+def position_index(white, black, side, white_count, black_count):
+    return ((side * BINOM[NUM_SQUARES][white_count] + combo_rank(white))
+            * BINOM[NUM_SQUARES][black_count] + combo_rank(black))
+
+
+def table_file_valid(path, white_count, black_count):
+    # Header and length match the material; a build that was cut short or
+    # another file format is not used
+    with open(path, 'rb') as f:
+        header = f.read(TB_HEADER_SIZE)
+    return (header[:len(TB_MAGIC)] == TB_MAGIC and header[8:10] == bytes([white_count, black_count])
+            and os.path.getsize(path) == TB_HEADER_SIZE + table_size(white_count, black_count))
+
+
+class Tablebase:
+    def __init__(self, directory=DEFAULT_TB_PATH):
+        self.directory = directory
+        self.tables = {}
+        self.materials = set()
+        self.invalid = []       # file names skipped by table_file_valid
+        for name in sorted(os.listdir(directory)):
+            stem, ext = os.path.splitext(name)
+            if ext != '.tb' or stem.count('v') != 1:
+                continue
+            white_count, black_count = stem.split('v')
+            if not (white_count.isdigit() and black_count.isdigit()):
+                continue
+            material = (int(white_count), int(black_count))
+            if (0 < min(material) and max(material) <= MAX_TB_PIECES
+                    and table_file_valid(os.path.join(directory, name), *material)):
+                self.materials.add(material)
+            else:
+                self.invalid.append(name)
+        self.max_pieces = max((w + b for w, b in self.materials), default=0)
+
+    def table(self, white_count, black_count):
+        table = self.tables.get((white_count, black_count))
+        if table is None:
+            path = table_path(self.directory, white_count, black_count)
+            table = np.memmap(path, dtype=np.int8, mode='r', offset=TB_HEADER_SIZE)
+            self.tables[(white_count, black_count)] = table
+        return table
+
+    def probe(self, pos):
+        # -> stored value, None without a table for this material
+        material = (pos.count[WHITE], pos.count[BLACK])
+        if material not in self.materials or pos.cont != NO_SQUARE:
+            return None
+        white, black = pos.bb
+        return self.table(*material).item(position_index(white, black, pos.side, *material))
+
+
+# --- Generation ---
+worker_tables = {}
+
+def lookup(directory, white, black, side, white_count, black_count):
+    # Value of a position in an already generated smaller table
+    key = (white_count, black_count)
+    if key not in worker_tables:
+        worker_tables[key] = np.memmap(table_path(directory, *key), dtype=np.int8, mode='r',
+                                       offset=TB_HEADER_SIZE)
+    return worker_tables[key].item(position_index(white, black, side, white_count, black_count))
+
+
+def table_edges(args):
+    # Moves of every position whose white pieces are in `white_sets`.
+    # Moves within the table become edges; captures and wins lead out of it
+    # and are summarised per position from the smaller tables.
+    directory, white_count, black_count, white_sets = args
+    indices, n_children, loss_min, win_count, win_max = [], [], [], [], []
+    parents, children = [], []
+    pos = Position()
+
+    for white_set in white_sets:
+        white = sum(1 << sq for sq in white_set)
+        for black_set in itertools.combinations(range(NUM_SQUARES), black_count):
+            black = sum(1 << sq for sq in black_set)
+            if white & black:
+                continue
+            for side in (WHITE, BLACK):
+                pos.bb[WHITE] = white
+                pos.bb[BLACK] = black
+                pos.side = side
+                pos.cont = NO_SQUARE
+                pos.compute_counters()
+                if pos.is_terminal():
+                    continue
+                index = position_index(white, black, side, white_count, black_count)
+                moves = 0
+                child_loss = NO_DISTANCE
+                child_wins = 0
+                child_win_max = 0
+                for move in pos.staged_moves():
+                    moves += 1
+                    pos.make_move(move)
+                    if pos.is_terminal():
+                        child_loss = 0
+                    elif move[2]:
+                        value = lookup(directory, pos.bb[WHITE], pos.bb[BLACK], pos.side,
+                                       pos.count[WHITE], pos.count[BLACK])
+                        if value > 0:
+                            child_wins += 1
+                            child_win_max = max(child_win_max, value)
+                        elif value < 0:
+                            child_loss = min(child_loss, -value - 1)
+                    else:
+                        parents.append(index)
+                        children.append(position_index(pos.bb[WHITE], pos.bb[BLACK], pos.side,
+                                                       white_count, black_count))
+                    pos.unmake_move()
+                indices.append(index)
+                n_children.append(moves)
+                loss_min.append(child_loss)
+                win_count.append(child_wins)
+                win_max.append(child_win_max)
+
+    return (np.array(indices, dtype=np.int64), np.array(n_children, dtype=np.int16),
+            np.array(loss_min, dtype=np.int16), np.array(win_count, dtype=np.int16),
+            np.array(win_max, dtype=np.int16),
+            np.array(parents, dtype=np.int64), np.array(children, dtype=np.int64))
+
+
+def solve(size, parts):
+    # Retrograde iteration: ply n = 1, 3, 5... finds wins (a move to a
+    # position lost in n - 1), n = 2, 4... finds losses (every move leads to
+    # a position won in at most n - 1). What is never resolved is a draw.
+    n_children = np.zeros(size, dtype=np.int16)
+    loss_min = np.full(size, NO_DISTANCE, dtype=np.int16)
+    win_count = np.zeros(size, dtype=np.int16)
+    win_max = np.zeros(size, dtype=np.int16)
+    parents = []
+    children = []
+    for indices, n, lm, wc, wm, p, c in parts:
+        n_children[indices] = n
+        loss_min[indices] = lm
+        win_count[indices] = wc
+        win_max[indices] = wm
+        parents.append(p)
+        children.append(c)
+    parents = np.concatenate(parents)
+    children = np.concatenate(children)
+
+    WIN, LOSS = 1, 2
+    kind = np.zeros(size, dtype=np.int8)
+    dist = np.zeros(size, dtype=np.int16)
+    active = n_children > 0
+    external = max(int(loss_min[loss_min < NO_DISTANCE].max(initial=0)), int(win_max.max(initial=0)))
+
+    n = 0
+    idle = 0
+    while idle < 2 or n <= external + 1:
+        n += 1
+        open_ = active & (kind == 0)
+        if n % 2:
+            newly = open_ & (loss_min == n - 1)
+            hit = (kind[children] == LOSS) & (dist[children] == n - 1)
+            reached = np.zeros(size, dtype=bool)
+            reached[parents[hit]] = True
+            newly |= open_ & reached
+            kind[newly] = WIN
+        else:
+            wins = np.bincount(parents, weights=kind[children] == WIN, minlength=size)
+            newly = open_ & (wins + win_count == n_children) & (win_max <= n - 1)
+            kind[newly] = LOSS
+        dist[newly] = n
+        idle = 0 if newly.any() else idle + 1
+
+    if dist.max(initial=0) > 126:
+        raise ValueError("distance does not fit the int8 table format")
+    values = np.zeros(size, dtype=np.int8)
+    values[kind == WIN] = dist[kind == WIN]
+    values[kind == LOSS] = -dist[kind == LOSS] - 1
+    return values
+
+
+def generate_table(directory, white_count, black_count, pool, chunk=32):
+    white_sets = list(itertools.combinations(range(NUM_SQUARES), white_count))
+    tasks = [(directory, white_count, black_count, white_sets[i:i + chunk])
+             for i in range(0, len(white_sets), chunk)]
+    parts = pool.map(table_edges, tasks)
+    values = solve(table_size(white_count, black_count), parts)
+
+    # Written next to the file and renamed over it, so an interrupted build
+    # never leaves a truncated table
+    path = table_path(directory, white_count, black_count)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        header = TB_MAGIC + bytes([white_count, black_count])
+        f.write(header.ljust(TB_HEADER_SIZE, b'\0'))
+        f.write(values.tobytes())
+    os.replace(tmp_path, path)
+    return values
+
+
+def tablebase_materials(max_pieces, max_total):
+    # Smaller totals first: captures lead into them
+    for total in range(2, max_total + 1):
+        for white_count in range(1, total):
+            black_count = total - white_count
+            if white_count <= max_pieces and black_count <= max_pieces:
+                yield white_count, black_count
+
+
+def generate_tablebases(directory, max_pieces, max_total, workers=None):
+    if max_pieces > MAX_TB_PIECES:
+        raise ValueError(f"at most {MAX_TB_PIECES} pieces per side")
+    os.makedirs(directory, exist_ok=True)
+    with mp.Pool(workers) as pool:
+        for white_count, black_count in tablebase_materials(max_pieces, max_total):
+            values = generate_table(directory, white_count, black_count, pool)
+            yield white_count, black_count, values
@@ -0,0 +1,167 @@
+import numpy as np
+
+from .piece import BOARD_SIZE
+
+# Transposition table in preallocated NumPy memory.
+# An entry is 16 bytes and a bucket of BUCKET_SIZE entries fills one 64-byte
+# cache line; a hash maps to one bucket. meta packs the search generation
+# (1..MAX_GENERATION, 0 = empty slot) and the bound flag, so a zeroed buffer
+# is an empty table.
+# score, move, depth and meta make up the entry's second 64-bit word, and
+# the key field holds hash ^ that word. The table is shared between
+# processes without locks (engine.smp): a probe reads the data word once and
+# only accepts it if it matches the key word, so a half-written entry is a
+# miss instead of another position's score.
+ENTRY_DTYPE = np.dtype([
+    ('key', np.uint64),
+    ('score', np.int32),
+    ('move', np.uint16),
+    ('depth', np.int8),
+    ('meta', np.uint8),
+])
+BUCKET_BITS = 2
+BUCKET_SIZE = 1 << BUCKET_BITS
+MAX_GENERATION = 63
+DEFAULT_HASH_MB = 16
+REPLACE_POLICIES = ('depth', 'always')
+
+
+# A move is packed into the 16-bit move field:
+#   bits 0-6   from square + 1 (0 means no move)
+#   bits 7-9   number of jumps, 0 for a quiet step
+#   bit 10     row direction of the jumps, 1 towards higher rows
+#   bits 11-14 quiet: index into STEP_DELTAS; jumps: one bit per jump, 1 to the higher column
+STEP_DELTAS = (BOARD_SIZE, -BOARD_SIZE, 1, -1)
+
+
+def encode_move(move):
+    if move is None:
+        return 0
+    frm, to, caps = move
+    if not caps:
+        return frm + 1 | STEP_DELTAS.index(to - frm) << 11
+
+    fw = BOARD_SIZE if to > frm else -BOARD_SIZE
+    jumps = 0
+    columns = 0
+    sq = frm
+    while sq != to:
+        mid = sq + fw + 1
+        if (caps >> mid) & 1:
+            columns |= 1 << jumps
+        else:
+            mid -= 2
+        sq = 2 * mid - sq
+        jumps += 1
+    return frm + 1 | jumps << 7 | (fw > 0) << 10 | columns << 11
+
+
+def decode_move(code):
+    if not code:
+        return None
+    frm = (code & 127) - 1
+    jumps = (code >> 7) & 7
+    if not jumps:
+        return frm, frm + STEP_DELTAS[code >> 11], 0
+
+    fw = BOARD_SIZE if (code >> 10) & 1 else -BOARD_SIZE
+    caps = 0
+    sq = frm
+    for k in range(jumps):
+        mid = sq + fw + (1 if (code >> (11 + k)) & 1 else -1)
+        caps |= 1 << mid
+        sq = 2 * mid - sq
+    return frm, sq, caps
+
+
+class TranspositionTable:
+    def __init__(self, size_mb=DEFAULT_HASH_MB, policy='depth', buffer=None):
+        if policy not in REPLACE_POLICIES:
+            raise ValueError(f"unknown replacement policy: {policy}")
+        self.size_mb = size_mb
+        self.policy = policy
+
+        # Largest power-of-two bucket count that fits in size_mb
+        bucket_bytes = ENTRY_DTYPE.itemsize * BUCKET_SIZE
+        num_buckets = 1
+        while num_buckets * 2 * bucket_bytes <= size_mb * 1024 * 1024:
+            num_buckets *= 2
+        self.bucket_mask = num_buckets - 1
+        self.num_entries = num_buckets * BUCKET_SIZE
+
+        if buffer is None:
+            self.table = np.zeros(self.num_entries, dtype=ENTRY_DTYPE)
+        else:
+            self.table = np.ndarray(self.num_entries, dtype=ENTRY_DTYPE, buffer=buffer)
+        self.keys = self.table['key']
+        self.scores = self.table['score']
+        self.moves = self.table['move']
+        self.depths = self.table['depth']
+        self.metas = self.table['meta']
+        words = self.table.view(np.uint64)
+        self.data = words[1::2]
+        self.generation = 1
+
+    def new_search(self):
+        # Entries from earlier searches become preferred replacement victims
+        self.generation = self.generation % MAX_GENERATION + 1
+
+    def clear(self):
+        self.table.fill(0)
+        self.generation = 1
+
+    def __len__(self):
+        return int(np.count_nonzero(self.metas >> 2))
+
+    def hashes(self):
+        # Position hash of every slot
+        return self.keys ^ self.data
+
+    def probe(self, key):
+        # -> (score, depth, flag, move) or None
+        i = (key & self.bucket_mask) << BUCKET_BITS
+        datas = self.data[i:i + BUCKET_SIZE].tolist()
+        keys = self.keys[i:i + BUCKET_SIZE].tolist()
+        for k in range(BUCKET_SIZE):
+            data = datas[k]
+            meta = data >> 56
+            if keys[k] ^ data == key and meta >> 2:
+                score = data & 0xFFFFFFFF
+                depth = (data >> 48) & 0xFF
+                return (score - (1 << 32) if score >> 31 else score,
+                        depth - 256 if depth >> 7 else depth,
+                        meta & 3, decode_move((data >> 32) & 0xFFFF))
+        return None
+
+    def store(self, key, score, depth, flag, move):
+        i = (key & self.bucket_mask) << BUCKET_BITS
+        gens = [meta >> 2 for meta in self.metas[i:i + BUCKET_SIZE].tolist()]
+        keys = [k ^ d for k, d in zip(self.keys[i:i + BUCKET_SIZE].tolist(),
+                                      self.data[i:i + BUCKET_SIZE].tolist())]
+        depths = self.depths[i:i + BUCKET_SIZE].tolist()
+        generation = self.generation
+
+        if key in keys and gens[keys.index(key)]:
+            # Same position
+            j = keys.index(key)
+        else:
+            # Victim: an empty slot, else the shallowest entry, older searches first
+            j = None
+            victim_value = None
+            for k in range(BUCKET_SIZE):
+                if not gens[k]:
+                    j = k
+                    break
+                value = depths[k] + (256 if gens[k] == generation else 0)
+                if victim_value is None or value < victim_value:
+                    j, victim_value = k, value
+
+        # Depth-preferred: a deeper entry of the current search is kept
+        if self.policy == 'depth' and gens[j] == generation and depths[j] > depth:
+            return
+
+        j += i
+        data = ((score & 0xFFFFFFFF) | encode_move(move) << 32 | (depth & 0xFF) << 48
+                | ((generation << 2) | flag) << 56)
+        self.data[j] = data
+        self.keys[j] = key ^ data
@@ -0,0 +1,58 @@
+import random
+
+from .piece import BOARD_SIZE
+
+#############################
+# ZOBRIST & HASH FUNCTIONS #
+#############################
+NUM_SQUARES = BOARD_SIZE * BOARD_SIZE
+
+# One flat table of keys:
+#   [owner_id * NUM_SQUARES + sq]  piece of owner_id (0 White, 1 Black) on sq
+#   [CONT_BASE + sq]               piece on sq has to continue capturing
+#   [SIDE_INDEX]                   Black to move
+CONT_BASE = 2 * NUM_SQUARES
+SIDE_INDEX = 3 * NUM_SQUARES
+ZOBRIST = [0] * (SIDE_INDEX + 1)
+
+def owner_to_id(owner):
+    if owner == 'Player1':
+        return 0
+    elif owner == 'Player2':
+        return 1
+    return 2
+
+# Fixed seed: the keys are the same in every process and every session, so
+# hashes can be stored in files (opening book) and shared with worker processes
+ZOBRIST_SEED = 0x46494E43
+
+def initialize_zobrist(seed=ZOBRIST_SEED):
+    # Filled in place so modules holding a reference to ZOBRIST stay valid
+    rng = random.Random(seed)
+    for i in range(len(ZOBRIST)):
+        ZOBRIST[i] = rng.getrandbits(64)
+
+def zobrist_signature():
+    # Identifies the key set, stored in files keyed by hash
+    h = 0
+    for key in ZOBRIST:
+        h = (h * 31 + key) & 0xFFFFFFFFFFFFFFFF
+    return h
+
+def get_board_hash(game):
+    # Full hash of a GameState; equals Position.from_game(game).hash
+    h = 0
+    for p in game.pieces:
+        if p.row < 0 or p.col < 0:
+            continue
+        h ^= ZOBRIST[owner_to_id(p.owner) * NUM_SQUARES + p.row * BOARD_SIZE + p.col]
+    if game.must_continue_capture and game.selected_piece is not None:
+        p = game.selected_piece
+        h ^= ZOBRIST[CONT_BASE + p.row * BOARD_SIZE + p.col]
+    if game.current_player == 'Player2':
+        h ^= ZOBRIST[SIDE_INDEX]
+    return h
+#############################
+
+# Initialize Zobrist hashing
+initialize_zobrist()
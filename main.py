@@ -1,25 +1,75 @@
+import argparse
+import os
 import pygame
 import sys
-from fianco import Fianco, PLAYERS, FONT_LARGE, WOOD_COLOR, WIDTH, HEIGHT, FPS
+from fianco import Fianco, PLAYERS, PLAYER_COLORS, FONT_LARGE, WOOD_COLOR, WIDTH, HEIGHT, FPS
+from engine import (
+    DEFAULT_HASH_MB, REPLACE_POLICIES, DEFAULT_BOOK_PATH, DEFAULT_TB_PATH,
+    DEFAULT_CACHE_PATH, OpeningBook, Tablebase, SearchCache, close_search_pool, save_search_cache
+)
+from ai import stop_pondering, poll_ai_move, cancel_ai_move
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Fianco - Human vs AI')
+    parser.add_argument('--hash-mb', type=int, default=DEFAULT_HASH_MB,
+                        help='transposition table size in MB')
+    parser.add_argument('--tt-replace', choices=REPLACE_POLICIES, default='depth',
+                        help='transposition table replacement policy')
+    parser.add_argument('--workers', '--threads', type=int, default=1,
+                        help='search processes sharing the transposition table (Lazy SMP)')
+    parser.add_argument('--ponder', action='store_true',
+                        help="keep searching on the opponent's time")
+    parser.add_argument('--book', default=DEFAULT_BOOK_PATH,
+                        help='opening book file, built with build_book.py; used if it exists')
+    parser.add_argument('--tablebases', default=DEFAULT_TB_PATH,
+                        help='endgame tablebase directory, built with build_tablebases.py; used if it exists')
+    parser.add_argument('--cache', nargs='?', const=DEFAULT_CACHE_PATH,
+                        help=f'keep deep search results in a file across sessions (default {DEFAULT_CACHE_PATH})')
+    return parser.parse_args()
 
 def main():
-    game = Fianco()
+    args = parse_args()
+    game = Fianco(hash_mb=args.hash_mb, tt_policy=args.tt_replace)
+    game.workers = max(1, args.workers)
+    game.use_ponder = args.ponder
+    if os.path.exists(args.book):
+        try:
+            game.book = OpeningBook(args.book)
+        except ValueError as error:
+            print(f"Ignoring the opening book: {error}")
+    if os.path.isdir(args.tablebases):
+        game.tablebase = Tablebase(args.tablebases)
+        for name in game.tablebase.invalid:
+            print(f"Ignoring tablebase file {name}: damaged or from an interrupted build")
+    if args.cache:
+        game.cache = SearchCache(args.cache)
 
     while True:
         elapsed = game.clock.tick(FPS)
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                cancel_ai_move(game)
+                stop_pondering(game)
+                if not game.game_over:
+                    save_search_cache(game)
+                close_search_pool(game)
                 pygame.quit()
                 sys.exit()
 
             game.handle_event_manual(event)
 
+        # The AI searches in a thread; its move is played here once it is ready
+        poll_ai_move(game)
+
         if game.state == 'game' and not game.game_over and not game.show_error:
             # Time updating
             game.player_times[game.current_player] -= elapsed
             if game.player_times[game.current_player] <= 0:
                 # When the time is up, rival wins
                 game.player_times[game.current_player] = 0
+                cancel_ai_move(game)
+                stop_pondering(game)
+                save_search_cache(game)
                 game.winner = 'Player2' if game.current_player == 'Player1' else 'Player1'
                 game.game_over = True
                 game.winner_name = PLAYERS[game.winner]['name']
@@ -42,13 +92,15 @@ def main():
         if game.state == 'game':
             game.draw_board()
             game.draw_timers()
+            if game.ai_thread is not None:
+                game.draw_thinking_indicator()
 
             if game.show_error and game.error_message:
                 game.display_error_message(game.error_message, game.close_button)
 
         elif game.state == 'winner_announce':
             game.window.fill(WOOD_COLOR)
-            announce_text = FONT_LARGE.render(f"{game.winner_name} Wins!", True, PLAYERS[game.winner]['color'])
+            announce_text = FONT_LARGE.render(f"{game.winner_name} Wins!", True, PLAYER_COLORS[game.winner])
             announce_rect = announce_text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
             game.window.blit(announce_text, announce_rect)
 